@@ -10,7 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
-from decouple import config
+from decouple import Csv, config
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "main",
 ]
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "main.CustomUser"
 
 MIDDLEWARE = [
+    "main.middleware.ConnectionTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.middleware.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "SocialMediaAPI.urls"
@@ -81,15 +85,58 @@ WSGI_APPLICATION = "SocialMediaAPI.wsgi.application"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'main.backends.postgresql',
         'NAME': 'SocialMediaAPI',
         'USER': 'postgres',
         'PASSWORD': config("DB_PASSWORD"),
         'HOST': 'database-test1.cxiwu8uk85nv.us-east-1.rds.amazonaws.com',
         'PORT': '5432',
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Database connections
+# "persistent" keeps each worker thread's connection open for DB_CONN_MAX_AGE
+# seconds. "pool" gives every process a psycopg 3 pool of DB_POOL_MIN_SIZE to
+# DB_POOL_MAX_SIZE connections; prefer it under ASGI, where requests do not
+# reuse threads. It needs psycopg[pool] and falls back to "persistent" when
+# that is not installed. "none" connects for every request.
+DB_CONNECTIONS = config("DB_CONNECTIONS", default="persistent")
+if DB_CONNECTIONS == "pool" and find_spec("psycopg_pool") is None:
+    DB_CONNECTIONS = "persistent"
+if DB_CONNECTIONS == "pool":
+    # CONN_HEALTH_CHECKS makes the pool check connections before handing
+    # them out.
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+        }
+    }
+elif DB_CONNECTIONS == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DB_CONN_MAX_AGE", default=60, cast=int
+    )
+# Requests that wait longer than this for a connection are logged.
+DB_CONNECT_SLOW_MS = config("DB_CONNECT_SLOW_MS", default=100, cast=int)
+
+# Read replicas
+# Comma-separated hosts of streaming replicas of the default database. GET,
+# HEAD and OPTIONS requests read from a random replica, except in views with
+# use_primary = True and for users who made a write request in the last
+# REPLICA_STICKY_SECONDS, who read from the primary to see their own changes.
+DB_REPLICA_HOSTS = config("DB_REPLICA_HOSTS", default="", cast=Csv())
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["main.db_routers.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=10, cast=int)
+
 # AWS S3 Settings
 AWS_ACCESS_KEY_ID = config("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = config("AWS_SECRET_ACCESS_KEY")
@@ -118,6 +165,131 @@ REST_FRAMEWORK = {
 }
 
 
+# Caching
+# "locmem" or "file" for development and tests, "redis" (needs the redis
+# package) or "memcached" (needs pymemcache) for a cache shared by workers.
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+}
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS[config("CACHE_BACKEND", default="locmem")],
+        "LOCATION": config("CACHE_LOCATION", default="social-media-api"),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", default=300, cast=int)
+
+
+# Home timeline (fan-out on write)
+TIMELINE_ENABLED = config("TIMELINE_ENABLED", default=False, cast=bool)
+TIMELINE_MAX_LENGTH = config("TIMELINE_MAX_LENGTH", default=800, cast=int)
+TIMELINE_FANOUT_LIMIT = config("TIMELINE_FANOUT_LIMIT", default=10000, cast=int)
+TIMELINE_BATCH_SIZE = config("TIMELINE_BATCH_SIZE", default=1000, cast=int)
+
+
+# Notifications
+NOTIFICATION_BATCH_SIZE = config("NOTIFICATION_BATCH_SIZE", default=1000, cast=int)
+# "thread" fans out in an in-process pool, "database" leaves jobs for the
+# run_fanout_worker command and "sync" fans out before the request returns.
+# Failed jobs are retried up to NOTIFICATION_FANOUT_MAX_ATTEMPTS times, after
+# a delay doubling from NOTIFICATION_FANOUT_RETRY_DELAY seconds: by the pool
+# with "thread", and by run_fanout_worker whenever it runs.
+NOTIFICATION_FANOUT_BACKEND = config("NOTIFICATION_FANOUT_BACKEND", default="thread")
+NOTIFICATION_FANOUT_THREADS = config("NOTIFICATION_FANOUT_THREADS", default=4, cast=int)
+NOTIFICATION_FANOUT_MAX_ATTEMPTS = config(
+    "NOTIFICATION_FANOUT_MAX_ATTEMPTS", default=5, cast=int
+)
+NOTIFICATION_FANOUT_RETRY_DELAY = config(
+    "NOTIFICATION_FANOUT_RETRY_DELAY", default=30, cast=int
+)
+NOTIFICATION_FANOUT_STALE_AFTER = config(
+    "NOTIFICATION_FANOUT_STALE_AFTER", default=600, cast=int
+)
+UNREAD_COUNT_TIMEOUT = config("UNREAD_COUNT_TIMEOUT", default=300, cast=int)
+# Server-sent events at /api/notifications/stream/ (requires serving the ASGI
+# application). The in-process broker only reaches clients connected to the
+# process that created the notification.
+NOTIFICATION_BROKER = config(
+    "NOTIFICATION_BROKER", default="main.realtime.InProcessBroker"
+)
+NOTIFICATION_STREAM_HEARTBEAT = config(
+    "NOTIFICATION_STREAM_HEARTBEAT", default=15, cast=int
+)
+NOTIFICATION_STREAM_QUEUE_SIZE = config(
+    "NOTIFICATION_STREAM_QUEUE_SIZE", default=100, cast=int
+)
+
+
+# Trending posts
+# Engagement loses half its weight every TRENDING_HALF_LIFE_HOURS. Changing
+# the half-life or the weights only applies to new events until
+# rebuild_trending_scores runs.
+TRENDING_HALF_LIFE_HOURS = config("TRENDING_HALF_LIFE_HOURS", default=12, cast=float)
+TRENDING_POST_WEIGHT = config("TRENDING_POST_WEIGHT", default=1.0, cast=float)
+TRENDING_LIKE_WEIGHT = config("TRENDING_LIKE_WEIGHT", default=1.0, cast=float)
+TRENDING_COMMENT_WEIGHT = config("TRENDING_COMMENT_WEIGHT", default=2.0, cast=float)
+
+
+# Social graph
+# Follow sets are cached per process as sorted id arrays, evicting the least
+# recently used once SOCIAL_GRAPH_CACHE_IDS ids are held. Sets larger than
+# SOCIAL_GRAPH_MAX_SET_SIZE are always read from the database; cached sets are
+# sent to PostgreSQL as query parameters, of which it accepts at most 65535.
+# Follow changes reach other processes through the default cache, so with
+# "locmem" they see them only once their copy is SOCIAL_GRAPH_CACHE_TTL
+# seconds old.
+SOCIAL_GRAPH_CACHE_IDS = config("SOCIAL_GRAPH_CACHE_IDS", default=5000000, cast=int)
+SOCIAL_GRAPH_CACHE_TTL = config("SOCIAL_GRAPH_CACHE_TTL", default=60, cast=int)
+SOCIAL_GRAPH_MAX_SET_SIZE = config(
+    "SOCIAL_GRAPH_MAX_SET_SIZE", default=10000, cast=int
+)
+
+
+# Batch like/unlike and follow/unfollow endpoints
+BATCH_MAX_ITEMS = config("BATCH_MAX_ITEMS", default=500, cast=int)
+
+
+# Data export
+# Rows read from the database, and lines compressed, at a time.
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+
+# Chunked media uploads
+# Clients send files in parts straight to storage: S3 through presigned URLs,
+# or the local backend (main.uploads.LocalUploadBackend) for development and
+# tests, which writes parts under UPLOAD_LOCAL_ROOT. S3 requires parts of at
+# least 5 MiB, and at most 10000 of them.
+UPLOAD_BACKEND = config("UPLOAD_BACKEND", default="main.uploads.S3UploadBackend")
+UPLOAD_LOCAL_ROOT = config("UPLOAD_LOCAL_ROOT", default=str(BASE_DIR / "uploads"))
+UPLOAD_PART_SIZE = config("UPLOAD_PART_SIZE", default=8 * 1024 * 1024, cast=int)
+UPLOAD_MAX_SIZE = config("UPLOAD_MAX_SIZE", default=5 * 1024**3, cast=int)
+UPLOAD_SESSION_TTL = config("UPLOAD_SESSION_TTL", default=86400, cast=int)
+UPLOAD_URL_EXPIRY = config("UPLOAD_URL_EXPIRY", default=3600, cast=int)
+UPLOAD_URLS_PER_RESPONSE = config("UPLOAD_URLS_PER_RESPONSE", default=100, cast=int)
+# Hash post media as it is received, to store it by content (main.media_store).
+FILE_UPLOAD_HANDLERS = [
+    "main.media_store.HashingMemoryFileUploadHandler",
+    "main.media_store.HashingTemporaryFileUploadHandler",
+]
+
+
+# Media derivatives
+# Resized WebP copies of post media and profile pictures. "process" renders
+# them in an in-process pool of worker processes after the upload commits,
+# "command" leaves them to the generate_derivatives command and "sync"
+# renders them before the request returns. Video frames require ffmpeg.
+MEDIA_DERIVATIVES_BACKEND = config("MEDIA_DERIVATIVES_BACKEND", default="process")
+MEDIA_DERIVATIVES_WORKERS = config("MEDIA_DERIVATIVES_WORKERS", default=2, cast=int)
+MEDIA_AVATAR_SIZES = config("MEDIA_AVATAR_SIZES", default="48,96,256", cast=Csv(int))
+MEDIA_THUMBNAIL_SIZES = config(
+    "MEDIA_THUMBNAIL_SIZES", default="320,640,1280", cast=Csv(int)
+)
+MEDIA_WEBP_QUALITY = config("MEDIA_WEBP_QUALITY", default=80, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
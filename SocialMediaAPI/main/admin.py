@@ -1,6 +1,15 @@
 from django.contrib import admin
 
-from .models import CustomUser, Profile, Post, Comment, Like, Follow, Notification
+from .models import (
+    CustomUser,
+    Profile,
+    Post,
+    Comment,
+    Like,
+    Follow,
+    Notification,
+    FanoutJob,
+)
 
 
 admin.site.register(CustomUser)
@@ -10,3 +19,4 @@ admin.site.register(Comment)
 admin.site.register(Like)
 admin.site.register(Follow)
 admin.site.register(Notification)
+admin.site.register(FanoutJob)
@@ -0,0 +1,23 @@
+import time
+from contextvars import ContextVar
+from django.db.backends.postgresql import base
+
+# Milliseconds spent acquiring connections during the current request, per
+# alias. Set up and reported by main.middleware.ConnectionTimingMiddleware.
+connect_timings = ContextVar("connect_timings", default=None)
+
+
+def record_connect(alias, elapsed):
+    timings = connect_timings.get()
+    if timings is not None:
+        timings[alias] = timings.get(alias, 0) + elapsed
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        # Opening a connection, or checking one out when pooling is enabled.
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_connect(self.alias, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from .fanout import enqueue_fanouts
+from .models import CustomUser, Follow, Like, Notification, Post
+from .posts_comments_functions import insert_likes, rebuild_post_counters
+from . import response_cache, social_graph, timeline
+
+
+def get_liked_posts(user, post_ids):
+    # One query: which of the posts exist and which of them the user likes.
+    liked = Like.objects.filter(user=user, post=OuterRef("pk"))
+    return dict(
+        Post.objects.filter(id__in=post_ids)
+        .annotate(liked=Exists(liked))
+        .values_list("id", "liked")
+    )
+
+
+def get_followed_users(user, user_ids):
+    followed = Follow.objects.filter(follower=user, following=OuterRef("pk"))
+    return dict(
+        CustomUser.objects.filter(id__in=user_ids)
+        .annotate(followed=Exists(followed))
+        .values_list("id", "followed")
+    )
+
+
+def refresh_post_counters(post_ids):
+    # Recounted rather than decremented: a concurrent request unliking the
+    # same posts deletes nothing but would still decrement.
+    if post_ids:
+        rebuild_post_counters(Post.objects.filter(id__in=post_ids))
+        for post_id in post_ids:
+            response_cache.invalidate("post", post_id)
+
+
+def like_posts(user, post_ids):
+    # Validation, insertion and the counter updates are one statement.
+    likes = insert_likes(user, post_ids)
+
+    def status(post_id):
+        if post_id not in likes:
+            return "not_found"
+        return "already_liked" if likes[post_id][1] is None else "liked"
+
+    return [{"post_id": post_id, "status": status(post_id)} for post_id in post_ids]
+
+
+def unlike_posts(user, post_ids):
+    with transaction.atomic():
+        posts = get_liked_posts(user, post_ids)
+        liked = [post_id for post_id in post_ids if posts.get(post_id)]
+        Like.objects.filter(user=user, post_id__in=liked).delete()
+        refresh_post_counters(liked)
+
+    statuses = {True: "unliked", False: "not_liked", None: "not_found"}
+    return [
+        {"post_id": post_id, "status": statuses[posts.get(post_id)]}
+        for post_id in post_ids
+    ]
+
+
+def follow_users(user, user_ids):
+    with transaction.atomic():
+        users = get_followed_users(user, user_ids)
+        users.pop(user.id, None)
+        new = [user_id for user_id in user_ids if users.get(user_id) is False]
+        Follow.objects.bulk_create(
+            [Follow(follower=user, following_id=user_id) for user_id in new],
+            ignore_conflicts=True,
+        )
+        if new:
+            # bulk_create() sends no post_save, so do what its receivers do.
+            follows = Follow.objects.filter(follower=user, following_id__in=new)
+            enqueue_fanouts("follow", follows)
+            social_graph.refresh_follow_counters([user.id, *new])
+            social_graph.invalidate_follows(user.id, new)
+            if settings.TIMELINE_ENABLED:
+                timeline.backfill_timeline(user.id, new)
+
+    statuses = {True: "already_following", False: "followed", None: "not_found"}
+    return [
+        {
+            "user_id": user_id,
+            "status": "self" if user_id == user.id else statuses[users.get(user_id)],
+        }
+        for user_id in user_ids
+    ]
+
+
+def delete_follows(follower_id, following_ids):
+    # One statement that sends no post_delete, whose receivers would update
+    # the counters and timeline once per row. The follows' notifications are
+    # deleted first, through the ORM so that the recipients' unread counts
+    # are invalidated.
+    Notification.objects.filter(
+        follow__follower_id=follower_id, follow__following_id__in=following_ids
+    ).delete()
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    follower = connection.ops.quote_name(Follow._meta.get_field("follower").column)
+    following = connection.ops.quote_name(Follow._meta.get_field("following").column)
+    placeholders = ", ".join(["%s"] * len(following_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {follower} = %s "
+            f"AND {following} IN ({placeholders})",
+            [follower_id, *following_ids],
+        )
+
+
+def unfollow_users(user, user_ids):
+    with transaction.atomic():
+        users = get_followed_users(user, user_ids)
+        followed = [user_id for user_id in user_ids if users.get(user_id)]
+        if followed:
+            # delete_follows() sends no post_delete, so do what its receivers
+            # do, once for the whole batch.
+            delete_follows(user.id, followed)
+            social_graph.refresh_follow_counters([user.id, *followed])
+            social_graph.invalidate_follows(user.id, followed)
+            if settings.TIMELINE_ENABLED:
+                timeline.remove_from_timeline(user.id, followed)
+
+    statuses = {True: "unfollowed", False: "not_following", None: "not_found"}
+    return [
+        {"user_id": user_id, "status": statuses[users.get(user_id)]}
+        for user_id in user_ids
+    ]
@@ -0,0 +1,153 @@
+import asyncio
+import io
+import sys
+import time
+from contextlib import contextmanager
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from .models import CustomUser, Post, Comment, Like, Follow
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    # Everything seeded for a benchmark run is thrown away afterwards.
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed_users(count, prefix="bench"):
+    users = [
+        CustomUser(
+            username=f"{prefix}_{index}",
+            email=f"{prefix}_{index}@example.com",
+            password="!",
+        )
+        for index in range(count)
+    ]
+    return CustomUser.objects.bulk_create(users)
+
+
+def seed_follows(follower, users):
+    follows = [Follow(follower=follower, following=user) for user in users]
+    return Follow.objects.bulk_create(follows)
+
+
+def seed_posts(authors, posts_per_author):
+    posts = [
+        Post(author=author, content=f"Benchmark post {index} by {author.username}")
+        for author in authors
+        for index in range(posts_per_author)
+    ]
+    return Post.objects.bulk_create(posts)
+
+
+def seed_engagement(posts, users, per_post):
+    likes = []
+    comments = []
+    for index, post in enumerate(posts):
+        for offset in range(index % (per_post + 1)):
+            user = users[(index + offset) % len(users)]
+            likes.append(Like(user=user, post=post))
+            comments.append(Comment(post=post, author=user, content="Benchmark"))
+    Like.objects.bulk_create(likes, ignore_conflicts=True)
+    Comment.objects.bulk_create(comments)
+
+
+def measure(func):
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, len(context.captured_queries), elapsed
+
+
+def call_view(view, user, path="/", method="get", data=None, **kwargs):
+    factory = APIRequestFactory()
+    request = getattr(factory, method)(path, data, format="json")
+    force_authenticate(request, user=user)
+    response = view(request, **kwargs)
+    response.render()
+    return response
+
+
+def wsgi_request(application, path, query="", headers=(), method="GET", body=b""):
+    # One request through a WSGI application, including the request
+    # started/finished signals that open and close database connections.
+    environ = {
+        "REQUEST_METHOD": method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "CONTENT_LENGTH": str(len(body)),
+        "CONTENT_TYPE": "application/json",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in headers:
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    started = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        started["status"] = int(status.split()[0])
+        started["headers"] = dict(response_headers)
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return started["status"], started["headers"]
+
+
+async def asgi_get(application, path, query="", headers=()):
+    # One GET request through an ASGI application, without a server.
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    body_sent = False
+    status = None
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client never disconnects; the handler cancels this when done.
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    return status
@@ -0,0 +1,37 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+# Enabled for the current request by ReplicaRoutingMiddleware. Everything
+# else, including commands and fan-out workers, reads from the primary.
+use_replicas = ContextVar("use_replicas", default=False)
+
+
+def sticky_key(user_id):
+    return f"replica:sticky:{user_id}"
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary ("default"). Reads go to a random replica when
+    the current request allows it, unless they run inside a transaction on
+    the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not use_replicas.get() or not settings.DATABASE_REPLICAS:
+            return "default"
+        if connections["default"].in_atomic_block:
+            return "default"
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        return db == "default"
@@ -0,0 +1,174 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, connections, transaction
+from . import imaging, response_cache
+from .models import Post, Profile
+
+logger = logging.getLogger(__name__)
+
+# Resized WebP copies of post media and profile pictures, stored beside the
+# original. A row's derivatives map each copy's name to its storage name,
+# plus "source", the file they were made from: copies whose source is not
+# the current file are stale and not served. Images are decoded and encoded
+# in a process pool, while a thread per file copies it to and from storage.
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+TARGETS = {
+    "post": (Post, "media"),
+    "profile": (Profile, "profile_picture"),
+}
+
+_executor = None
+_process_pool = None
+
+
+def get_specs(target):
+    if target == "post":
+        return [
+            (f"thumbnail_{size}", size, False)
+            for size in settings.MEDIA_THUMBNAIL_SIZES
+        ]
+    return [(f"avatar_{size}", size, True) for size in settings.MEDIA_AVATAR_SIZES]
+
+
+def get_urls(target, name, derivatives, request=None):
+    # Rendered like FileField renders the original.
+    if not name or derivatives.get("source") != name:
+        return {}
+    storage = TARGETS[target][0]._meta.get_field(TARGETS[target][1]).storage
+    urls = {}
+    for key, stored in derivatives.items():
+        if key != "source":
+            url = storage.url(stored)
+            urls[key] = url if request is None else request.build_absolute_uri(url)
+    return urls
+
+
+def is_stale(instance, field_name, update_fields=None):
+    if update_fields is not None and field_name not in update_fields:
+        return False
+    name = getattr(instance, field_name).name
+    return bool(name) and instance.derivatives.get("source") != name
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.MEDIA_DERIVATIVES_WORKERS,
+            thread_name_prefix="derivatives",
+        )
+    return _executor
+
+
+def get_process_pool():
+    # Spawned rather than forked, since the web process runs threads.
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.MEDIA_DERIVATIVES_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def schedule(target, pk):
+    match settings.MEDIA_DERIVATIVES_BACKEND:
+        case "sync":
+            transaction.on_commit(lambda: generate(target, pk))
+        case "process":
+            transaction.on_commit(
+                lambda: get_executor().submit(run_in_thread, target, pk)
+            )
+        case _:
+            # "command": generate_derivatives picks the file up.
+            pass
+
+
+def run_in_thread(target, pk, force=False):
+    close_old_connections()
+    try:
+        return generate(target, pk, force)
+    except Exception:
+        logger.exception("Generating derivatives of %s %s failed", target, pk)
+        raise
+    finally:
+        # Like main.fanout's threads, these outlive requests.
+        connections.close_all()
+
+
+def render(source, specs, directory):
+    args = (source, specs, settings.MEDIA_WEBP_QUALITY, directory)
+    if settings.MEDIA_DERIVATIVES_BACKEND == "sync":
+        return imaging.render(*args)
+    return get_process_pool().submit(imaging.render, *args).result()
+
+
+def generate(target, pk, force=False):
+    model, field_name = TARGETS[target]
+    instance = model.objects.filter(pk=pk).only(field_name, "derivatives").first()
+    if instance is None:
+        return None
+    file = getattr(instance, field_name)
+    if not file or not (force or is_stale(instance, field_name)):
+        return instance.derivatives
+
+    # Rows with the same file, the posts of one media blob, share copies.
+    rows = model.objects.filter(**{field_name: file.name})
+    if not force:
+        shared = (
+            rows.filter(derivatives__source=file.name)
+            .values_list("derivatives", flat=True)
+            .first()
+        )
+        if shared is not None:
+            update(target, rows, shared)
+            return shared
+
+    storage = file.storage
+    derivatives = {"source": file.name}
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source")
+        with storage.open(file.name, "rb") as original, open(source, "wb") as copy:
+            shutil.copyfileobj(original, copy, STREAM_CHUNK_SIZE)
+        root = os.path.splitext(file.name)[0]
+        for name, path in render(source, get_specs(target), directory):
+            with open(path, "rb") as output:
+                derivatives[name] = storage.save(f"{root}.{name}.webp", File(output))
+
+    previous = list(rows.values_list("derivatives", flat=True))
+    # None if the file was replaced meanwhile, and the new copies lose.
+    if not update(target, rows, derivatives):
+        delete(storage, derivatives)
+        return None
+    for old in {tuple(sorted(old.items())): old for old in previous}.values():
+        source = old.get("source")
+        # Copies of a previous file still used by other rows stay.
+        if (
+            source == file.name
+            or not model.objects.filter(**{field_name: source}).exists()
+        ):
+            delete(storage, old, keep=derivatives)
+    return derivatives
+
+
+def update(target, rows, derivatives):
+    pks = list(rows.values_list("pk", flat=True))
+    updated = rows.filter(pk__in=pks).update(derivatives=derivatives)
+    for pk in pks:
+        response_cache.invalidate(target, pk)
+    return updated
+
+
+def delete(storage, derivatives, keep=None):
+    kept = set((keep or {}).values())
+    for key, stored in derivatives.items():
+        if key != "source" and stored not in kept:
+            storage.delete(stored)
@@ -0,0 +1,89 @@
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.text import compress_sequence
+from .models import Comment, Follow, Like, Notification, Post, Profile
+
+# One NDJSON line per row, tagged with its type. Every queryset is read with
+# iterator(), so only EXPORT_CHUNK_SIZE rows are held at a time whatever the
+# size of the account.
+EXPORTS = (
+    (
+        "post",
+        lambda user: Post.objects.filter(author=user),
+        ("id", "content", "timestamp", "media", "like_count", "comment_count"),
+    ),
+    (
+        "comment",
+        lambda user: Comment.objects.filter(author=user),
+        ("id", "post", "content", "created_at", "updated_at"),
+    ),
+    (
+        "like",
+        lambda user: Like.objects.filter(user=user),
+        ("id", "post", "created_at"),
+    ),
+    (
+        "follow",
+        lambda user: Follow.objects.filter(Q(follower=user) | Q(following=user)),
+        ("id", "follower", "following", "created_at"),
+    ),
+    (
+        "notification",
+        lambda user: Notification.objects.filter(recipient=user),
+        (
+            "id",
+            "sender",
+            "notification_type",
+            "post",
+            "comment",
+            "follow",
+            "created_at",
+            "read",
+        ),
+    ),
+)
+
+
+def to_line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+def export_records(user):
+    profile = Profile.objects.filter(user=user).values("bio").first() or {}
+    yield {
+        "type": "user",
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "date_joined": user.date_joined,
+        "bio": profile.get("bio"),
+    }
+    for record_type, get_queryset, fields in EXPORTS:
+        rows = (
+            get_queryset(user)
+            .order_by("id")
+            .values(*fields)
+            .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        )
+        for row in rows:
+            yield {"type": record_type, **row}
+
+
+def export_chunks(user):
+    # Lines joined into one chunk per EXPORT_CHUNK_SIZE rows, so that gzip
+    # compresses and flushes whole chunks rather than single lines.
+    chunk = []
+    for record in export_records(user):
+        chunk.append(to_line(record))
+        if len(chunk) == settings.EXPORT_CHUNK_SIZE:
+            yield "".join(chunk).encode()
+            chunk = []
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def export_stream(user, compress=False):
+    chunks = export_chunks(user)
+    return compress_sequence(chunks) if compress else chunks
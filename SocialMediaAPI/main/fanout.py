@@ -0,0 +1,198 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Comment, FanoutJob, Follow, Post
+from .notifications import notify_followers
+from . import timeline
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.NOTIFICATION_FANOUT_THREADS,
+            thread_name_prefix="fanout",
+        )
+    return _executor
+
+
+def enqueue_fanout(kind, instance):
+    # The job row is written in the same transaction as the post, comment or
+    # follow, so it exists exactly when the object does.
+    job, _ = FanoutJob.objects.get_or_create(
+        idempotency_key=f"{kind}:{instance.pk}",
+        defaults={"kind": kind, "object_id": instance.pk},
+    )
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job
+
+
+def enqueue_fanouts(kind, instances):
+    # enqueue_fanout() for objects created with bulk_create(), which sends
+    # no post_save signals.
+    keys = {f"{kind}:{instance.pk}": instance.pk for instance in instances}
+    FanoutJob.objects.bulk_create(
+        [
+            FanoutJob(kind=kind, object_id=object_id, idempotency_key=key)
+            for key, object_id in keys.items()
+        ],
+        ignore_conflicts=True,
+    )
+    job_ids = list(
+        FanoutJob.objects.filter(idempotency_key__in=keys).values_list("id", flat=True)
+    )
+
+    def dispatch_all():
+        for job_id in job_ids:
+            dispatch(job_id)
+
+    transaction.on_commit(dispatch_all)
+    return job_ids
+
+
+def dispatch(job_id):
+    match settings.NOTIFICATION_FANOUT_BACKEND:
+        case "sync":
+            run_job(job_id)
+        case "thread":
+            get_executor().submit(run_in_thread, job_id)
+        case _:
+            # "database": a run_fanout_worker process picks the job up.
+            pass
+
+
+def retry_in_thread(job_id, delay):
+    # The thread backend has no worker polling for due jobs, so a failed job
+    # is submitted again once its delay is over. Timers die with the process;
+    # run_fanout_worker picks up the jobs they leave behind.
+    timer = threading.Timer(delay, dispatch, args=[job_id])
+    timer.daemon = True
+    timer.start()
+
+
+def run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        # Pool threads outlive requests, so persistent connections
+        # (CONN_MAX_AGE) would stay open for as long as the process does.
+        connections.close_all()
+
+
+def claim(job_id):
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.NOTIFICATION_FANOUT_STALE_AFTER)
+    claimed = (
+        FanoutJob.objects.filter(id=job_id, run_after__lte=now)
+        .filter(
+            Q(status=FanoutJob.PENDING)
+            | Q(status=FanoutJob.RUNNING, updated_at__lt=stale)
+        )
+        .update(status=FanoutJob.RUNNING, attempts=F("attempts") + 1, updated_at=now)
+    )
+    if claimed:
+        return FanoutJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job_id):
+    job = claim(job_id)
+    if job is None:
+        return False
+
+    def checkpoint(last_follower_id):
+        FanoutJob.objects.filter(id=job.id).update(
+            last_follower_id=last_follower_id, updated_at=timezone.now()
+        )
+
+    try:
+        HANDLERS[job.kind](job, checkpoint)
+    except Exception as error:
+        logger.exception("Fan-out job %s failed", job.idempotency_key)
+        retry = job.attempts < settings.NOTIFICATION_FANOUT_MAX_ATTEMPTS
+        delay = settings.NOTIFICATION_FANOUT_RETRY_DELAY * 2 ** (job.attempts - 1)
+        FanoutJob.objects.filter(id=job.id).update(
+            status=FanoutJob.PENDING if retry else FanoutJob.FAILED,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            last_error=str(error),
+        )
+        if retry and settings.NOTIFICATION_FANOUT_BACKEND == "thread":
+            retry_in_thread(job.id, delay)
+        return False
+
+    FanoutJob.objects.filter(id=job.id).update(status=FanoutJob.DONE, last_error="")
+    return True
+
+
+def fan_out_post(job, checkpoint):
+    post = Post.objects.select_related("author").filter(id=job.object_id).first()
+    if post is None:
+        return
+    if settings.TIMELINE_ENABLED:
+        timeline.fan_out_post(post)
+    notify_followers(
+        post.author,
+        "post",
+        after=job.last_follower_id,
+        on_batch=checkpoint,
+        post=post,
+    )
+
+
+def fan_out_comment(job, checkpoint):
+    comment = Comment.objects.select_related("author").filter(id=job.object_id)
+    comment = comment.first()
+    if comment is None:
+        return
+    notify_followers(
+        comment.author,
+        "comment",
+        after=job.last_follower_id,
+        on_batch=checkpoint,
+        comment=comment,
+    )
+
+
+def fan_out_follow(job, checkpoint):
+    follow = Follow.objects.select_related("follower").filter(id=job.object_id)
+    follow = follow.first()
+    if follow is None:
+        return
+    notify_followers(
+        follow.follower,
+        "follow",
+        after=job.last_follower_id,
+        on_batch=checkpoint,
+        follow=follow,
+    )
+
+
+HANDLERS = {
+    "post": fan_out_post,
+    "comment": fan_out_comment,
+    "follow": fan_out_follow,
+}
+
+
+def due_jobs(limit):
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.NOTIFICATION_FANOUT_STALE_AFTER)
+    return list(
+        FanoutJob.objects.filter(run_after__lte=now)
+        .filter(
+            Q(status=FanoutJob.PENDING)
+            | Q(status=FanoutJob.RUNNING, updated_at__lt=stale)
+        )
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:limit]
+    )
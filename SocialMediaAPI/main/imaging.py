@@ -0,0 +1,83 @@
+import os
+import shutil
+import subprocess
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Runs in the worker processes of main.derivatives, so it imports nothing
+# from Django.
+
+FRAME_TIMEOUT = 60
+
+
+def extract_frame(path, directory):
+    # A representative frame of a video, when ffmpeg is installed.
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    frame = os.path.join(directory, "frame.png")
+    try:
+        subprocess.run(
+            [
+                ffmpeg,
+                "-v",
+                "error",
+                "-i",
+                path,
+                "-vf",
+                "thumbnail",
+                "-frames:v",
+                "1",
+                frame,
+            ],
+            check=True,
+            capture_output=True,
+            timeout=FRAME_TIMEOUT,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    return frame if os.path.exists(frame) else None
+
+
+def open_image(path, directory):
+    try:
+        return Image.open(path)
+    except UnidentifiedImageError:
+        frame = extract_frame(path, directory)
+        return None if frame is None else Image.open(frame)
+
+
+def render(path, specs, quality, directory):
+    """
+    Write a WebP file into directory for every (name, size, square) in
+    specs: the image at path cropped to a square of side size, or scaled to
+    fit within size by size. Images are never enlarged. Returns
+    (name, path) pairs, none if path is neither an image nor a video, or
+    cannot be decoded.
+    """
+    try:
+        image = open_image(path, directory)
+        if image is None:
+            return []
+        with image:
+            # JPEGs decode straight at a fraction of their size when that is
+            # still larger than every derivative.
+            largest = max(size for _, size, _ in specs)
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    except (OSError, Image.DecompressionBombError):
+        # Truncated or corrupt files, and images too large to decode safely.
+        return []
+
+    outputs = []
+    for name, size, square in specs:
+        if square:
+            side = min(size, *image.size)
+            copy = ImageOps.fit(image, (side, side), Image.Resampling.LANCZOS)
+        else:
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        output = os.path.join(directory, f"{name}.webp")
+        copy.save(output, "WEBP", quality=quality, method=4)
+        outputs.append((name, output))
+    return outputs
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import Notification
+
+
+def unread_count_key(user_id):
+    return f"inbox:unread:{user_id}"
+
+
+def get_unread_count(user):
+    key = unread_count_key(user.id)
+    count = cache.get(key)
+    if count is None:
+        # Served from notification_unread_idx, and only after a change.
+        count = Notification.objects.filter(recipient=user, read=False).count()
+        cache.set(key, count, settings.UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def invalidate_unread_counts(user_ids):
+    cache.delete_many([unread_count_key(user_id) for user_id in user_ids])
+
+
+def mark_read(user, up_to=None):
+    notifications = Notification.objects.filter(recipient=user, read=False)
+    if up_to is not None:
+        notifications = notifications.filter(id__lte=up_to)
+    marked = notifications.update(read=True)
+    if marked:
+        invalidate_unread_counts([user.id])
+    return marked
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from main import benchmarking
+from main.models import CustomUser, Follow, Notification, Profile
+
+PREFIX = "async_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the read-heavy endpoints through the ASGI application with many "
+        "concurrent requests and compare requests/sec and p99 latency of the "
+        "sync views with their async variants."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--posts-per-user", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(username__startswith=f"{PREFIX}_").exists():
+            raise CommandError(f"Users named {PREFIX}_* already exist.")
+
+        # Requests run on their own connections, so the data is committed and
+        # deleted afterwards rather than rolled back.
+        users = self.seed(options)
+        try:
+            application = get_asgi_application()
+            host = next(
+                (host for host in settings.ALLOWED_HOSTS if "*" not in host),
+                "localhost",
+            )
+            self.stdout.write(
+                f"{'endpoint':<14} {'mode':<6} {'req/s':>9} {'p50 ms':>9} "
+                f"{'p99 ms':>9} {'errors':>7}"
+            )
+            for name in ("posts", "comments", "notifications", "user", "profile"):
+                for mode in ("sync", "async"):
+                    requests = self.build_requests(name, mode, users, host, options)
+                    results = asyncio.run(
+                        self.load(application, requests, options["concurrency"])
+                    )
+                    self.report(name, mode, *results)
+        finally:
+            CustomUser.objects.filter(username__startswith=f"{PREFIX}_").delete()
+
+    def seed(self, options):
+        users = benchmarking.seed_users(options["users"], prefix=PREFIX)
+        profiles = Profile.objects.bulk_create([Profile(user=user) for user in users])
+        rng = random.Random(0)
+        follows = Follow.objects.bulk_create(
+            [
+                Follow(follower=user, following=followed)
+                for user in users
+                for followed in rng.sample(users, min(len(users), 20))
+                if followed != user
+            ]
+        )
+        posts = benchmarking.seed_posts(users, options["posts_per_user"])
+        benchmarking.seed_engagement(posts, users, per_post=3)
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient=follow.following,
+                    sender=follow.follower,
+                    notification_type="follow",
+                    follow=follow,
+                )
+                for follow in follows
+            ]
+        )
+        self.post_ids = [post.id for post in posts]
+        self.profile_ids = [profile.id for profile in profiles]
+        return users
+
+    def build_requests(self, name, mode, users, host, options):
+        rng = random.Random(1)
+        prefix = "/api/async/" if mode == "async" else "/api/"
+        requests = []
+        for _ in range(options["requests"]):
+            user = rng.choice(users)
+            path = {
+                "posts": "posts/",
+                "comments": f"comments/{rng.choice(self.post_ids)}/",
+                "notifications": "notifications/",
+                "user": f"user/{rng.choice(users).id}/",
+                "profile": f"profile/{rng.choice(self.profile_ids)}/",
+            }[name]
+            headers = [
+                ("host", host),
+                ("authorization", f"Bearer {AccessToken.for_user(user)}"),
+            ]
+            requests.append((prefix + path, headers))
+        return requests
+
+    async def load(self, application, requests, concurrency):
+        pending = iter(requests)
+        latencies = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for path, headers in pending:
+                start = time.perf_counter()
+                status = await benchmarking.asgi_get(application, path, "", headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, sorted(latencies), errors
+
+    def report(self, name, mode, elapsed, latencies, errors):
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+        self.stdout.write(
+            f"{name:<14} {mode:<6} {len(latencies) / elapsed:>9.1f} "
+            f"{percentile(0.5):>9.2f} {percentile(0.99):>9.2f} {errors:>7}"
+        )
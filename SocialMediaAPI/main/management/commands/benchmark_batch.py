@@ -0,0 +1,88 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from main import benchmarking, views
+
+
+class Command(BaseCommand):
+    help = (
+        "Like posts and follow users one request at a time and in one batch "
+        "request, and report queries and items/sec for both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=200)
+
+    def handle(self, *args, **options):
+        items = options["items"]
+        self.stdout.write(
+            f"{'action':<8} {'mode':<7} {'items':>6} {'queries':>8} "
+            f"{'ms':>9} {'items/s':>9}"
+        )
+        with benchmarking.rolled_back():
+            reader = benchmarking.seed_users(1, prefix="batch_reader")[0]
+            authors = benchmarking.seed_users(items * 2, prefix="batch_author")
+            posts = benchmarking.seed_posts(authors, 1)
+
+            single, batch = posts[:items], posts[items:]
+            self.run(
+                "like",
+                "single",
+                items,
+                lambda: [
+                    self.call(views.ListCreateLikeView, reader, "post", post_id=post.id)
+                    for post in single
+                ],
+            )
+            self.run(
+                "like",
+                "batch",
+                items,
+                lambda: self.call(
+                    views.BatchLikeView,
+                    reader,
+                    "post",
+                    {"post_ids": [post.id for post in batch]},
+                ),
+            )
+
+            single, batch = authors[:items], authors[items:]
+            self.run(
+                "follow",
+                "single",
+                items,
+                lambda: [
+                    self.call(
+                        views.ListCreateFollowView,
+                        reader,
+                        "post",
+                        follower_id=author.id,
+                    )
+                    for author in single
+                ],
+            )
+            self.run(
+                "follow",
+                "batch",
+                items,
+                lambda: self.call(
+                    views.BatchFollowView,
+                    reader,
+                    "post",
+                    {"user_ids": [author.id for author in batch]},
+                ),
+            )
+
+    def call(self, view, user, method, data=None, **kwargs):
+        response = benchmarking.call_view(
+            view.as_view(), user, "/", method=method, data=data, **kwargs
+        )
+        if response.status_code not in (200, 201):
+            raise CommandError(f"{view.__name__} returned {response.status_code}")
+        return response
+
+    def run(self, action, mode, items, func):
+        _, queries, elapsed = benchmarking.measure(func)
+        self.stdout.write(
+            f"{action:<8} {mode:<7} {items:>6} {queries:>8} "
+            f"{elapsed:>9.1f} {items / elapsed * 1000:>9.0f}"
+        )
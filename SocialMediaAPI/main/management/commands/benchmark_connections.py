@@ -0,0 +1,83 @@
+import re
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from rest_framework_simplejwt.tokens import AccessToken
+from main import benchmarking
+from main.models import CustomUser, Profile
+
+PREFIX = "connection_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Send sequential requests through the WSGI application with the "
+        "configured DB_CONNECTIONS mode and report the p50 latency and the "
+        "time spent acquiring database connections. Run it once per mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if CustomUser.objects.filter(username__startswith=f"{PREFIX}_").exists():
+            raise CommandError(f"Users named {PREFIX}_* already exist.")
+
+        # The request_finished signal closes or releases connections, which
+        # would end a rolled-back transaction, so the data is committed.
+        users = benchmarking.seed_users(10, prefix=PREFIX)
+        profile = Profile.objects.create(user=users[1])
+        benchmarking.seed_follows(users[0], users[1:])
+        benchmarking.seed_posts(users[1:], 5)
+        connections.close_all()
+        try:
+            self.run(users[0], profile, options["requests"])
+        finally:
+            CustomUser.objects.filter(username__startswith=f"{PREFIX}_").delete()
+
+    def run(self, reader, profile, requests):
+        application = get_wsgi_application()
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if "*" not in host),
+            "localhost",
+        )
+        headers = [
+            ("host", host),
+            ("authorization", f"Bearer {AccessToken.for_user(reader)}"),
+        ]
+        database = settings.DATABASES["default"]
+        self.stdout.write(
+            f"DB_CONNECTIONS={settings.DB_CONNECTIONS} "
+            f"CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)} "
+            f"pool={'pool' in database.get('OPTIONS', {})}"
+        )
+        self.stdout.write(
+            f"{'endpoint':<12} {'p50 ms':>9} {'connect p50':>12} {'connect max':>12}"
+        )
+        for name, path in (
+            ("posts", "/api/posts/"),
+            ("profile", f"/api/profile/{profile.id}/"),
+            ("users", "/api/user/"),
+        ):
+            latencies = []
+            connects = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                status, response_headers = benchmarking.wsgi_request(
+                    application, path, "", headers
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    raise CommandError(f"{path} returned {status}")
+                timing = re.search(
+                    r"db-connect;dur=([\d.]+)",
+                    response_headers.get("Server-Timing", ""),
+                )
+                connects.append(float(timing.group(1)) if timing else 0.0)
+            self.stdout.write(
+                f"{name:<12} {statistics.median(latencies):>9.2f} "
+                f"{statistics.median(connects):>12.2f} {max(connects):>12.2f}"
+            )
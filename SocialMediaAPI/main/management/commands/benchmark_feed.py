@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from main import benchmarking
+from main.views import ListPostView
+
+
+class Command(BaseCommand):
+    help = "Seed feeds of growing size and report queries and latency per page."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", type=int, default=[10, 100, 1000, 5000]
+        )
+        parser.add_argument("--posts-per-author", type=int, default=5)
+
+    def handle(self, *args, **options):
+        view = ListPostView.as_view()
+        self.stdout.write(f"{'posts':>8} {'sort_by':>10} {'queries':>8} {'ms':>10}")
+        for size in options["sizes"]:
+            with benchmarking.rolled_back():
+                reader = benchmarking.seed_users(1, prefix="feed_reader")[0]
+                authors = benchmarking.seed_users(
+                    max(1, size // options["posts_per_author"]), prefix="feed_author"
+                )
+                benchmarking.seed_follows(reader, authors)
+                posts = benchmarking.seed_posts(authors, options["posts_per_author"])
+                benchmarking.seed_engagement(posts, authors, per_post=3)
+
+                for sort_by in (None, "likes", "comments"):
+                    data = {"sort_by": sort_by} if sort_by else None
+                    response, queries, elapsed = benchmarking.measure(
+                        lambda: benchmarking.call_view(view, reader, "/", data=data)
+                    )
+                    if response.status_code != 200:
+                        self.stderr.write(f"Request failed: {response.status_code}")
+                    self.stdout.write(
+                        f"{len(posts):>8} {sort_by or '-':>10} {queries:>8} {elapsed:>10.2f}"
+                    )
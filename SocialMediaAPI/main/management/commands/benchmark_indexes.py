@@ -0,0 +1,135 @@
+import random
+import time
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+from main import benchmarking
+from main.models import Comment, Follow, Notification, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed data at scale and report EXPLAIN plans and latencies of the hot "
+        "queries with and without the indexes declared on the main models."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--posts-per-user", type=int, default=20)
+        parser.add_argument("--follows-per-user", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--plans", action="store_true", help="Print the full query plans."
+        )
+
+    def handle(self, *args, **options):
+        with benchmarking.rolled_back():
+            reader = self.seed(options)
+            queries = self.get_queries(reader)
+
+            with_indexes = self.run(queries, options)
+            self.drop_indexes()
+            without_indexes = self.run(queries, options)
+
+        self.stdout.write(f"{'query':<24} {'indexed ms':>11} {'unindexed ms':>13}")
+        for name in queries:
+            self.stdout.write(
+                f"{name:<24} {with_indexes[name][0]:>11.3f} "
+                f"{without_indexes[name][0]:>13.3f}"
+            )
+        for label, results in (("with", with_indexes), ("without", without_indexes)):
+            self.stdout.write(f"\nPlans {label} indexes:")
+            for name, (_, plan) in results.items():
+                lines = plan.splitlines()
+                shown = lines if options["plans"] else lines[:1]
+                self.stdout.write(f"{name}:\n    " + "\n    ".join(shown))
+
+    def seed(self, options):
+        users = benchmarking.seed_users(options["users"], prefix="index_bench")
+        rng = random.Random(0)
+        follows = {
+            (user.id, followed.id)
+            for user in users
+            for followed in rng.sample(users, options["follows_per_user"])
+            if followed != user
+        }
+        Follow.objects.bulk_create(
+            [Follow(follower_id=a, following_id=b) for a, b in follows],
+            batch_size=5000,
+        )
+        posts = Post.objects.bulk_create(
+            [
+                Post(author=user, content=f"Index benchmark {index}")
+                for user in users
+                for index in range(options["posts_per_user"])
+            ],
+            batch_size=5000,
+        )
+        comments = Comment.objects.bulk_create(
+            [
+                Comment(post=rng.choice(posts), author=user, content="Benchmark")
+                for user in users
+                for _ in range(options["posts_per_user"])
+            ],
+            batch_size=5000,
+        )
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=follower_id,
+                    sender_id=followed_id,
+                    notification_type="comment",
+                    comment=rng.choice(comments),
+                    read=rng.random() < 0.8,
+                )
+                for follower_id, followed_id in follows
+            ],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return users[0]
+
+    def get_queries(self, reader):
+        following = Follow.objects.filter(follower=reader).values("following")
+        post = Comment.objects.values_list("post_id", flat=True).first()
+        return {
+            "feed": Post.objects.filter(author__in=following).order_by(
+                "-timestamp", "-id"
+            )[:10],
+            "author_posts": Post.objects.filter(author=reader).order_by(
+                "-timestamp", "-id"
+            )[:10],
+            "post_comments": Comment.objects.filter(post_id=post).order_by(
+                "created_at", "id"
+            )[:10],
+            "notifications_sent": Notification.objects.filter(
+                sender__in=following
+            ).order_by("-created_at", "-id")[:10],
+            "notifications_inbox": Notification.objects.filter(
+                recipient=reader, read=False
+            ).order_by("-created_at", "-id")[:10],
+            "followers": Follow.objects.filter(following=reader).order_by("follower")[
+                :10
+            ],
+        }
+
+    def run(self, queries, options):
+        results = {}
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) * 1000 / options["repeat"]
+            results[name] = (elapsed, plan)
+        return results
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for model in apps.get_app_config("main").get_models():
+                for index in model._meta.indexes:
+                    schema_editor.remove_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
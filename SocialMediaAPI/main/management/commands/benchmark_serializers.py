@@ -0,0 +1,129 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from main import benchmarking, views
+from main.models import Comment, Follow, Like, Notification
+from main.renderers import ORJSONRenderer
+
+ENDPOINTS = {
+    "list_post": (views.ListPostView, {}),
+    "list_comment": (views.ListCommentView, {"post_id": None}),
+    "list_like": (views.ListCreateLikeView, {}),
+    "list_notification": (views.ListNotification, {}),
+    "notification_inbox": (views.ListInboxView, {}),
+}
+
+
+def model_view(view):
+    # The same view serving GET through its ModelSerializer and JSONRenderer.
+    return type(
+        f"Model{view.__name__}",
+        (view,),
+        {
+            "reads_values": lambda self: False,
+            "renderer_classes": [JSONRenderer, BrowsableAPIRenderer],
+        },
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize and render the list endpoints from model instances with "
+        "their ModelSerializers and JSONRenderer, and from values() rows with "
+        "the values serializers and ORJSONRenderer. Report rows/sec and fail "
+        "if the two outputs differ by a byte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'endpoint':<20} {'path':<7} {'fetch ms':>9} {'serialize ms':>13} "
+            f"{'render ms':>10} {'rows/s':>10}"
+        )
+        with benchmarking.rolled_back():
+            reader, post = self.seed(options["rows"])
+            for name, (view, kwargs) in ENDPOINTS.items():
+                if "post_id" in kwargs:
+                    kwargs = {"post_id": post.id}
+                self.check_pages(name, view, reader, kwargs)
+                self.compare(name, view, reader, kwargs, options)
+
+    def seed(self, rows):
+        reader = benchmarking.seed_users(1, prefix="serializer_reader")[0]
+        authors = benchmarking.seed_users(rows, prefix="serializer_author")
+        benchmarking.seed_follows(reader, authors)
+        posts = benchmarking.seed_posts(authors, 1)
+        Like.objects.bulk_create([Like(user=reader, post=post) for post in posts])
+        comments = Comment.objects.bulk_create(
+            [
+                Comment(post=posts[0], author=author, content=f"Comment {index} é")
+                for index, author in enumerate(authors)
+            ]
+        )
+        follows = list(Follow.objects.filter(follower=reader))
+        types = ("post", "comment", "follow")
+        Notification.objects.bulk_create(
+            Notification(
+                recipient=reader,
+                sender=author,
+                notification_type=types[index % 3],
+                **{types[index % 3]: (post, comment, follow)[index % 3]},
+            )
+            for index, (author, post, comment, follow) in enumerate(
+                zip(authors, posts, comments, follows)
+            )
+        )
+        return reader, posts[0]
+
+    def check_pages(self, name, view, reader, kwargs):
+        for params in ({}, {"page_size": 2}, {"pagination": "cursor"}):
+            expected = benchmarking.call_view(
+                model_view(view).as_view(), reader, "/", data=params, **kwargs
+            )
+            actual = benchmarking.call_view(
+                view.as_view(), reader, "/", data=params, **kwargs
+            )
+            if actual.content != expected.content:
+                raise CommandError(f"{name} renders a different page for {params}.")
+
+    def get_view(self, view, reader, kwargs):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=reader)
+        instance = view()
+        instance.setup(request, **kwargs)
+        instance.request = instance.initialize_request(request, **kwargs)
+        instance.format_kwarg = None
+        return instance
+
+    def compare(self, name, view, reader, kwargs, options):
+        outputs = {}
+        for path, view_class, renderer in (
+            ("model", model_view(view), JSONRenderer()),
+            ("values", view, ORJSONRenderer()),
+        ):
+            instance = self.get_view(view_class, reader, kwargs)
+            timings = [0.0, 0.0, 0.0]
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                rows = list(instance.filter_queryset(instance.get_queryset()))
+                fetched = time.perf_counter()
+                data = instance.get_serializer(rows, many=True).data
+                serialized = time.perf_counter()
+                content = renderer.render({"results": data})
+                rendered = time.perf_counter()
+                for index, elapsed in enumerate(
+                    (fetched - start, serialized - fetched, rendered - serialized)
+                ):
+                    timings[index] += elapsed * 1000 / options["repeat"]
+            outputs[path] = content
+            rows_per_second = len(rows) * 1000 / sum(timings)
+            self.stdout.write(
+                f"{name:<20} {path:<7} {timings[0]:>9.2f} {timings[1]:>13.2f} "
+                f"{timings[2]:>10.2f} {rows_per_second:>10.0f}"
+            )
+        if outputs["model"] != outputs["values"]:
+            raise CommandError(f"{name} renders different bytes for all rows.")
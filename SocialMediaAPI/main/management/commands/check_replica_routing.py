@@ -0,0 +1,83 @@
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from main import benchmarking
+from main.db_routers import sticky_key
+from main.models import CustomUser
+
+PREFIX = "routing_check"
+
+
+class Command(BaseCommand):
+    help = (
+        "Send requests through the WSGI application and fail unless reads go "
+        "to a replica, writes, pinned views and recent writers to the primary."
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas are configured (DB_REPLICA_HOSTS).")
+        if CustomUser.objects.filter(username__startswith=f"{PREFIX}_").exists():
+            raise CommandError(f"Users named {PREFIX}_* already exist.")
+
+        user = benchmarking.seed_users(1, prefix=PREFIX)[0]
+        cache.delete(sticky_key(user.id))
+        try:
+            failures = self.run(user)
+        finally:
+            CustomUser.objects.filter(username__startswith=f"{PREFIX}_").delete()
+        if failures:
+            raise CommandError(f"Misrouted: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Requests are routed as expected."))
+
+    def run(self, user):
+        application = get_wsgi_application()
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if "*" not in host),
+            "localhost",
+        )
+        headers = [
+            ("host", host),
+            ("authorization", f"Bearer {AccessToken.for_user(user)}"),
+        ]
+        body = json.dumps({"content": "Routing check"}).encode()
+        checks = [
+            ("feed read", "GET", "/api/posts/", "replica"),
+            ("pinned view", "GET", f"/api/user/{user.id}/", "default"),
+            ("write", "POST", "/api/create-post/", "default"),
+            ("read after write", "GET", "/api/posts/", "default"),
+        ]
+
+        failures = []
+        self.stdout.write(f"{'request':<18} {'status':>6}  queries by database")
+        for name, method, path, expected in checks:
+            status, used = self.request(application, method, path, headers, body)
+            self.stdout.write(f"{name:<18} {status:>6}  {used}")
+            targets = {"replica" if alias != "default" else alias for alias in used}
+            if targets != {expected}:
+                failures.append(name)
+        return failures
+
+    def request(self, application, method, path, headers, body):
+        aliases = ["default", *settings.DATABASE_REPLICAS]
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in aliases]
+        for context in contexts:
+            context.__enter__()
+        try:
+            status, _ = benchmarking.wsgi_request(
+                application, path, "", headers, method=method, body=body
+            )
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+        used = {
+            alias: len(context.captured_queries)
+            for alias, context in zip(aliases, contexts)
+            if context.captured_queries
+        }
+        return status, used
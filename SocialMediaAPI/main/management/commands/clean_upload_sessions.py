@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from main.models import UploadSession
+from main.uploads import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Abort the storage uploads of expired upload sessions, discarding their "
+        "parts, and delete every expired session."
+    )
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+        aborted = 0
+        # Sessions still completing at expiry were left by a failed request.
+        unfinished = expired.filter(
+            status__in=[UploadSession.PENDING, UploadSession.COMPLETING]
+        )
+        for session in unfinished.iterator():
+            get_backend().abort(session)
+            aborted += 1
+        deleted, _ = expired.delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Aborted {aborted} uploads and deleted {deleted} sessions."
+            )
+        )
@@ -0,0 +1,34 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from main.export import export_stream
+from main.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Write everything a user created or received as NDJSON, one record per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument("user", help="User id or username.")
+        parser.add_argument(
+            "--output", help="File to write; standard output if omitted."
+        )
+        parser.add_argument("--gzip", action="store_true")
+
+    def handle(self, *args, **options):
+        key = "id" if options["user"].isdigit() else "username"
+        user = CustomUser.objects.filter(**{key: options["user"]}).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        chunks = export_stream(user, compress=options["gzip"])
+        if options["output"] is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stderr.write(
+            self.style.SUCCESS(f"Exported {user.username} to {options['output']}.")
+        )
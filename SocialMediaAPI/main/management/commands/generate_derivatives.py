@@ -0,0 +1,60 @@
+from concurrent.futures import wait
+from django.core.management.base import BaseCommand
+from django.db.models import F, TextField, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+from main import derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized copies of post media and profile pictures that "
+        "are missing or were made from a previous file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate the copies of every file, for example after changing sizes.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.generated = self.failed = 0
+        for target, (model, field_name) in derivatives.TARGETS.items():
+            rows = model.objects.exclude(**{field_name: ""}).exclude(
+                **{f"{field_name}__isnull": True}
+            )
+            if not options["force"]:
+                source = Coalesce(
+                    KT("derivatives__source"), Value(""), output_field=TextField()
+                )
+                rows = rows.alias(source=source).exclude(source=F(field_name))
+            pks = []
+            for pk in rows.values_list("pk", flat=True).iterator():
+                pks.append(pk)
+                if len(pks) == options["batch_size"]:
+                    self.generate(target, pks, options["force"])
+                    pks = []
+            self.generate(target, pks, options["force"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated derivatives of {self.generated} files, "
+                f"{self.failed} failed."
+            )
+        )
+
+    def generate(self, target, pks, force):
+        executor = derivatives.get_executor()
+        futures = {
+            executor.submit(derivatives.run_in_thread, target, pk, force): pk
+            for pk in pks
+        }
+        wait(futures)
+        for future, pk in futures.items():
+            if future.exception() is None:
+                self.generated += 1
+            else:
+                self.failed += 1
+                self.stderr.write(f"{target} {pk}: {future.exception()}")
@@ -0,0 +1,49 @@
+import time
+from importlib.util import find_spec
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the follow recommendations of every user from the follow "
+        "graph, ranked by mutual connections. Schedule it periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit", type=int, default=50, help="Recommendations kept per user."
+        )
+        parser.add_argument(
+            "--min-mutual",
+            type=int,
+            default=1,
+            help="Mutual connections a candidate needs to be recommended.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users whose candidates are counted in one matrix product.",
+        )
+
+    def handle(self, *args, **options):
+        if find_spec("numpy") is None or find_spec("scipy") is None:
+            raise CommandError(
+                "generate_recommendations needs numpy and scipy, which are "
+                "listed in requirements.txt."
+            )
+        from main.recommendations import generate_recommendations
+
+        start = time.perf_counter()
+        users, stored = generate_recommendations(
+            limit=options["limit"],
+            min_mutual=options["min_mutual"],
+            batch_size=options["batch_size"],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {stored} recommendations for {users} users "
+                f"in {elapsed:.1f}s."
+            )
+        )
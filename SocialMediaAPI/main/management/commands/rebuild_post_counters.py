@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from main.models import Post
+from main.posts_comments_functions import rebuild_post_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute Post.like_count and Post.comment_count from Like and Comment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = Post.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                updated += rebuild_post_counters(
+                    Post.objects.filter(id__gte=start, id__lt=start + batch_size)
+                )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counters for {updated} posts."))
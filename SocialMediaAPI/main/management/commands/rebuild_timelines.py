@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from main.models import CustomUser, TimelineEntry
+from main.timeline import rebuild_timeline, trim_timelines
+from main.utils import chunked
+
+
+class Command(BaseCommand):
+    help = "Rebuild every home timeline, or trim them to TIMELINE_MAX_LENGTH."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--trim-only",
+            action="store_true",
+            help="Only drop entries beyond TIMELINE_MAX_LENGTH.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["trim_only"]:
+            user_ids = (
+                TimelineEntry.objects.order_by("user_id")
+                .values_list("user_id", flat=True)
+                .distinct()
+                .iterator()
+            )
+            removed = 0
+            for batch in chunked(user_ids, options["batch_size"]):
+                removed += trim_timelines(batch)
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} entries."))
+            return
+
+        rebuilt = 0
+        for user in CustomUser.objects.order_by("id").iterator():
+            rebuild_timeline(user)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} timelines."))
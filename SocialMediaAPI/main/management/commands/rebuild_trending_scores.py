@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from main.models import Comment, Like, Post
+from main.trending import rebuild_trending_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.trending_score from Like and Comment, dropping removed "
+        "likes and comments. Schedule it periodically with --days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Only posts created, liked or commented on in the last N days.",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options["days"] is not None:
+            since = timezone.now() - timedelta(days=options["days"])
+            liked = Like.objects.filter(created_at__gte=since).values("post_id")
+            commented = Comment.objects.filter(created_at__gte=since).values("post_id")
+            posts = posts.filter(
+                Q(timestamp__gte=since) | Q(id__in=liked) | Q(id__in=commented)
+            )
+
+        batch_size = options["batch_size"]
+        last_id = posts.aggregate(last_id=Max("id"))["last_id"] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                updated += rebuild_trending_scores(
+                    posts.filter(id__gte=start, id__lt=start + batch_size)
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt trending scores for {updated} posts.")
+        )
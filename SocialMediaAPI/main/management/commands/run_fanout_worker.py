@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from main.fanout import due_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process pending notification fan-out jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no jobs are due instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job_ids = due_jobs(options["batch_size"])
+            for job_id in job_ids:
+                if run_job(job_id):
+                    self.stdout.write(f"Completed fan-out job {job_id}.")
+            if not job_ids:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
@@ -0,0 +1,121 @@
+import hashlib
+import os
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.db import transaction
+from django.db.models import F
+from .models import MediaBlob, Post
+
+# Post media is stored once per content, under a name derived from its
+# SHA-256, and shared by every post with the same bytes. The digest is taken
+# as the bytes arrive: by the upload handlers below for multipart uploads,
+# and while LocalUploadBackend assembles the parts of a chunked upload.
+# Files uploaded straight to S3 are never seen by the API and keep their
+# session key. A MediaBlob counts the posts that use its file, which is
+# deleted with the blob once the last of them is.
+
+STREAM_CHUNK_SIZE = 64 * 1024
+EXTENSION_LENGTH = 10
+
+
+class HashingMemoryFileUploadHandler(MemoryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.activated:
+            self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.digest.hexdigest()
+        return file
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def get_storage():
+    return Post._meta.get_field("media").storage
+
+
+def hash_file(file):
+    # For files that did not come through the hashing upload handlers.
+    digest = hashlib.sha256()
+    for chunk in file.chunks(STREAM_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(digest, filename):
+    ext = os.path.splitext(filename)[1][:EXTENSION_LENGTH].lower()
+    upload_to = Post._meta.get_field("media").upload_to
+    return f"{upload_to}sha256/{digest[:2]}/{digest}{ext}"
+
+
+def store(file, digest=None):
+    """
+    Returns the storage name of the content of file, saving it only if no
+    blob holds it yet, and counts one more post using it. Call it in the
+    transaction that creates the post.
+    """
+    digest = digest or getattr(file, "sha256", None) or hash_file(file)
+    storage = get_storage()
+    with transaction.atomic():
+        # Locked so that sweep() cannot delete the file meanwhile.
+        blob, created = MediaBlob.objects.select_for_update().get_or_create(
+            sha256=digest,
+            defaults={"name": blob_name(digest, file.name), "size": file.size},
+        )
+        # A file left by a rolled back transaction already has the content.
+        if created and not storage.exists(blob.name):
+            name = storage.save(blob.name, file)
+            if name != blob.name:
+                blob.name = name
+                blob.save(update_fields=["name"])
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+    return blob.name
+
+
+def release(name, derivatives=None):
+    # One post fewer uses the blob stored as name, if any. The post's
+    # derivatives, shared by every post of the blob, go with its file.
+    updated = MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1
+    )
+    if updated:
+        transaction.on_commit(lambda: sweep(name, derivatives or {}))
+    return bool(updated)
+
+
+def sweep(name, derivatives=None):
+    storage = get_storage()
+    with transaction.atomic():
+        blob = (
+            MediaBlob.objects.select_for_update().filter(name=name, ref_count=0).first()
+        )
+        if blob is None:
+            return False
+        storage.delete(name)
+        for key, stored in (derivatives or {}).items():
+            if key != "source":
+                storage.delete(stored)
+        blob.delete()
+    return True
@@ -0,0 +1,95 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .backends.postgresql.base import connect_timings
+from .db_routers import sticky_key, use_replicas
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionTimingMiddleware(MiddlewareMixin):
+    """
+    Reports the time spent acquiring database connections as a Server-Timing
+    entry (db-connect) and logs requests that waited longer than
+    DB_CONNECT_SLOW_MS. Reused persistent or pooled connections report 0.
+    """
+
+    def process_request(self, request):
+        request.connect_timings = {}
+        connect_timings.set(request.connect_timings)
+
+    def process_response(self, request, response):
+        timings = getattr(request, "connect_timings", None)
+        if timings is None:
+            return response
+
+        elapsed = sum(timings.values())
+        entries = [f"db-connect;dur={elapsed:.2f}"]
+        if "Server-Timing" in response.headers:
+            entries.insert(0, response.headers["Server-Timing"])
+        response.headers["Server-Timing"] = ", ".join(entries)
+        if elapsed > settings.DB_CONNECT_SLOW_MS:
+            logger.warning(
+                "Waited %.1f ms for a database connection on %s",
+                elapsed,
+                request.path,
+            )
+        return response
+
+
+def get_token_user_id(request):
+    # Middleware runs before DRF authenticates the request; the user id is
+    # read from the access token without a database query.
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+def uses_primary(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    # The async views wrap a DRF view class in their own view_class.
+    wrapped = getattr(view_class, "view_class", None)
+    return any(getattr(cls, "use_primary", False) for cls in (view_class, wrapped))
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Lets GET, HEAD and OPTIONS requests read from the DATABASE_REPLICAS.
+    A write request makes its user read from the primary for the next
+    REPLICA_STICKY_SECONDS, so they see their own post, like or follow.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replicas.set(False)
+        if not settings.DATABASE_REPLICAS:
+            return None
+
+        user_id = get_token_user_id(request)
+        if request.method not in SAFE_METHODS:
+            if user_id is not None:
+                cache.set(sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+            return None
+        if uses_primary(view_func):
+            return None
+        if user_id is not None and cache.get(sticky_key(user_id)):
+            return None
+        use_replicas.set(True)
+        return None
+
+    def process_response(self, request, response):
+        use_replicas.set(False)
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0002_alter_profile_bio"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="notification_type",
+            field=models.CharField(
+                choices=[
+                    ("like", "Like"),
+                    ("comment", "Comment"),
+                    ("follow", "Follow"),
+                    ("post", "Post"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
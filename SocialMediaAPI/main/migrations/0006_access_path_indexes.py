@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:22
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the tables against writes.
+    atomic = False
+
+    dependencies = [
+        ("main", "0005_fanout_jobs"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at", "id"], name="comment_post_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="follow",
+            index=models.Index(
+                fields=["following", "follower"], name="follow_following_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="like",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="like_user_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "read", "-created_at"],
+                name="notification_inbox_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("read", False)),
+                fields=["recipient", "-created_at", "-id"],
+                name="notification_unread_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="notification",
+            index=models.Index(
+                fields=["sender", "-created_at", "-id"], name="notification_sender_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-timestamp", "-id"], name="post_author_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(fields=["-timestamp", "-id"], name="post_time_idx"),
+        ),
+    ]
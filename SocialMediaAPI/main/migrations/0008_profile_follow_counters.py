@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_follows(apps, schema_editor):
+    Follow = apps.get_model("main", "Follow")
+    Profile = apps.get_model("main", "Profile")
+
+    def total(field):
+        return Coalesce(
+            Subquery(
+                Follow.objects.filter(**{field: OuterRef("user")})
+                .order_by()
+                .values(field)
+                .annotate(total=Count("id"))
+                .values("total")
+            ),
+            0,
+        )
+
+    Profile.objects.update(
+        follower_count=total("following"), following_count=total("follower")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_post_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="follower_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:57
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("main", "0009_follow_recommendations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="trending_score",
+            field=models.FloatField(default=0),
+        ),
+        AddIndexConcurrently(
+            model_name="post",
+            index=models.Index(
+                fields=["-trending_score", "-id"], name="post_trending_idx"
+            ),
+        ),
+    ]
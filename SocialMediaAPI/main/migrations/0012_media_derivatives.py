@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0011_upload_session"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
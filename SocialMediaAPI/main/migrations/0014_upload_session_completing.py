@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0013_media_blob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("completing", "Completing"),
+                    ("completed", "Completed"),
+                    ("aborted", "Aborted"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
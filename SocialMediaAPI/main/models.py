@@ -1,4 +1,9 @@
+import uuid
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
 
@@ -45,6 +50,11 @@ class Profile(models.Model):
     profile_picture = models.ImageField(
         upload_to="profile_pics/", blank=True, null=True
     )
+    # Storage names of resized copies of profile_picture, see main.derivatives.
+    derivatives = models.JSONField(default=dict, blank=True)
+    fanout_on_read = models.BooleanField(default=False)
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.user}'s profile."
@@ -57,11 +67,69 @@ class Post(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     media = models.FileField(upload_to="media/", blank=True, null=True)
+    derivatives = models.JSONField(default=dict, blank=True)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+    search_vector = models.GeneratedField(
+        expression=SearchVector("content", config="english"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["author", "-timestamp", "-id"], name="post_author_time_idx"
+            ),
+            models.Index(fields=["-timestamp", "-id"], name="post_time_idx"),
+            models.Index(fields=["-trending_score", "-id"], name="post_trending_idx"),
+            GinIndex(fields=["search_vector"], name="post_search_idx"),
+            # Serves content__icontains, which compiles to UPPER(content) LIKE.
+            GinIndex(
+                OpClass(Upper("content"), name="gin_trgm_ops"),
+                name="post_content_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} | Content: {self.content[:30]}..."
 
 
+class MediaBlob(models.Model):
+    # Post media stored once per content under a name derived from its
+    # SHA-256, shared by ref_count posts. See main.media_store.
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} posts)"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(
+                fields=["user", "-timestamp", "-post"], name="timeline_user_time_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"Timeline of {self.user.username}: {self.post}"
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(
@@ -71,6 +139,13 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "created_at", "id"], name="comment_post_time_idx"
+            )
+        ]
+
     def __str__(self):
         return f"{self.author.username} - {self.content[:30]}"
 
@@ -82,6 +157,11 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ("user", "post")
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="like_user_time_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.user.username} liked {self.post}"
@@ -98,11 +178,37 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ("follower", "following")
+        indexes = [
+            models.Index(fields=["following", "follower"], name="follow_following_idx")
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
 
 
+class FollowRecommendation(models.Model):
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    candidate = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="recommended_to"
+    )
+    mutual_count = models.PositiveIntegerField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "candidate")
+        indexes = [
+            models.Index(
+                fields=["user", "-mutual_count", "candidate"],
+                name="recommendation_rank_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"Recommend {self.candidate.username} to {self.user.username}"
+
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
         ("like", "Like"),
@@ -126,5 +232,115 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient", "read", "-created_at"],
+                name="notification_inbox_idx",
+            ),
+            models.Index(
+                fields=["recipient", "-created_at", "-id"],
+                condition=models.Q(read=False),
+                name="notification_unread_idx",
+            ),
+            models.Index(
+                fields=["sender", "-created_at", "-id"],
+                name="notification_sender_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipient", "post"],
+                condition=models.Q(notification_type="post"),
+                name="unique_post_notification",
+            ),
+            models.UniqueConstraint(
+                fields=["recipient", "comment"],
+                condition=models.Q(notification_type="comment"),
+                name="unique_comment_notification",
+            ),
+            models.UniqueConstraint(
+                fields=["recipient", "follow"],
+                condition=models.Q(notification_type="follow"),
+                name="unique_follow_notification",
+            ),
+        ]
+
     def __str__(self):
         return f"Notification for {self.recipient.username} from {self.sender.username} ({self.notification_type})"
+
+
+class FanoutJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    kind = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    object_id = models.BigIntegerField()
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_follower_id = models.BigIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="fanoutjob_due_idx")
+        ]
+
+    def __str__(self):
+        return f"Fan-out {self.idempotency_key} ({self.status})"
+
+
+class UploadSession(models.Model):
+    POST = "post"
+    PROFILE_PICTURE = "profile_picture"
+    TARGETS = (
+        (POST, "Post"),
+        (PROFILE_PICTURE, "Profile picture"),
+    )
+    PENDING = "pending"
+    COMPLETING = "completing"
+    COMPLETED = "completed"
+    ABORTED = "aborted"
+    STATUSES = (
+        (PENDING, "Pending"),
+        (COMPLETING, "Completing"),
+        (COMPLETED, "Completed"),
+        (ABORTED, "Aborted"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    target = models.CharField(max_length=20, choices=TARGETS)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    part_size = models.PositiveBigIntegerField()
+    # Storage name of the finished file, and the backend's id for the upload.
+    key = models.CharField(max_length=100)
+    upload_id = models.CharField(max_length=1024, blank=True)
+    # Content of the post created on completion.
+    content = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["expires_at"], name="upload_expiry_idx")]
+
+    def __str__(self):
+        return f"Upload of {self.filename} by {self.user.username} ({self.status})"
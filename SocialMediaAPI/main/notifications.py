@@ -0,0 +1,40 @@
+from django.conf import settings
+from .inbox import invalidate_unread_counts
+from .models import Notification
+from .realtime import get_broker
+from . import social_graph
+from .utils import chunked
+
+
+def notify_followers(user, notification_type, after=0, on_batch=None, **target):
+    batch_size = settings.NOTIFICATION_BATCH_SIZE
+    follower_ids = social_graph.iter_follower_ids(
+        user.id, after=after, chunk_size=batch_size
+    )
+    event = {
+        "notification_type": notification_type,
+        "sender": user.id,
+        "sender_name": user.username,
+        **{field: instance.pk for field, instance in target.items()},
+    }
+    notified = 0
+    for batch in chunked(follower_ids, batch_size):
+        # The unique constraints on Notification make retried batches no-ops.
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=follower_id,
+                    sender=user,
+                    notification_type=notification_type,
+                    **target,
+                )
+                for follower_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        invalidate_unread_counts(batch)
+        get_broker().publish(batch, event)
+        notified += len(batch)
+        if on_batch is not None:
+            on_batch(batch[-1])
+    return notified
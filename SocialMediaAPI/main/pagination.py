@@ -0,0 +1,222 @@
+import base64
+import json
+from datetime import datetime
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CustomPagination(PageNumberPagination):
+    page_size = 10
+    page_query_param = "page_size"
+    max_page_size = 10
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                },
+                "count": self.page.paginator.count,
+                "results": data,
+            }
+        )
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # paginate_queryset() for async views: the same page and links, with
+        # the count and the page fetched through the async ORM.
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        objects = [item async for item in queryset[bottom : bottom + page_size]]
+        self.page = Page(objects, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return objects
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ordering such as ("-timestamp", "-id").
+
+    Pages are fetched with a WHERE clause on the last row seen instead of an
+    OFFSET, and no total count is computed, so every page costs the same.
+    """
+
+    page_size = 10
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_ordering(self, view):
+        if hasattr(view, "get_cursor_ordering"):
+            return tuple(view.get_cursor_ordering())
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page([item async for item in queryset])
+
+    def get_page_queryset(self, queryset, request, view):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.model = queryset.model
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        self.cursor = cursor
+        self.reverse = cursor is not None and cursor["direction"] == "previous"
+
+        ordering = self.reverse_ordering() if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(ordering, cursor["position"]))
+        return queryset[: self.page_size + 1]
+
+    def get_page(self, results):
+        cursor = self.cursor
+        reverse = self.reverse
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_position = None
+        self.previous_position = None
+        if results:
+            if has_more or reverse:
+                self.next_position = self.get_position(results[-1])
+            if (has_more and reverse) or (cursor is not None and not reverse):
+                self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {
+                    "next": self.get_link("next", self.next_position),
+                    "previous": self.get_link("previous", self.previous_position),
+                },
+                "results": data,
+            }
+        )
+
+    def reverse_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def after(self, ordering, position):
+        # (a, b, c) > (x, y, z) expanded into OR-ed equality prefixes.
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_position(self, item):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            if isinstance(item, dict):
+                value = item[name]
+            else:
+                value = getattr(item, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, direction, position):
+        payload = json.dumps({"direction": direction, "position": position})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if cursor["direction"] not in ("next", "previous"):
+                raise ValueError
+            if len(cursor["position"]) != len(self.ordering):
+                raise ValueError
+            cursor["position"] = [
+                self.to_python(field, value)
+                for field, value in zip(self.ordering, cursor["position"])
+            ]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def to_python(self, field, value):
+        try:
+            model_field = self.model._meta.get_field(field.lstrip("-"))
+        except FieldDoesNotExist:
+            return value
+        try:
+            return model_field.to_python(value)
+        except Exception:
+            raise ValueError
+
+    def get_link(self, direction, position):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, CustomPagination.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(direction, position)
+        )
+
+
+class SelectablePagination(BasePagination):
+    """
+    Page-number pagination by default; keyset pagination when the request
+    carries a cursor or asks for ?pagination=cursor.
+    """
+
+    mode_query_param = "pagination"
+
+    def get_paginator(self, request):
+        params = request.query_params
+        if (
+            params.get(self.mode_query_param) == "cursor"
+            or KeysetPagination.cursor_query_param in params
+        ):
+            return KeysetPagination()
+        return CustomPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return await self.paginator.apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
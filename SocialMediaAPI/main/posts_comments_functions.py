@@ -1,17 +1,172 @@
-from .models import Like, Comment
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Comment, CustomUser, Like, Post
+from . import response_cache, social_graph, trending
 
 
-def get_post_likes(post):
-    likes = Like.objects.filter(post=post)
-    number_of_likes = likes.count()
-    return {"post": post, "total_likes": number_of_likes}
+def get_feed_posts(user):
+    following_users = social_graph.following_of(user.id)
+    return Post.objects.filter(Q(author__in=following_users) | Q(author=user))
 
 
-def get_sorted_posts(post_data):
-    return post_data["post"]
+def get_feed_ordering(sort_by=None):
+    match sort_by:
+        case "likes":
+            return ("-like_count", "-timestamp", "-id")
+        case "comments":
+            return ("-comment_count", "-timestamp", "-id")
+        case "trending":
+            return trending.ORDERING
+        case _:
+            return ("-timestamp", "-id")
 
 
-def get_post_comments(post):
-    comments = Comment.objects.filter(post=post)
-    number_of_comments = comments.count()
-    return {"post": post, "total_comments": number_of_comments}
+def sort_posts(posts, sort_by=None):
+    return posts.order_by(*get_feed_ordering(sort_by))
+
+
+def update_post_counters(post_id, likes=0, comments=0):
+    # Only gains are scored; removed likes and comments stay in the score
+    # until rebuild_trending_scores runs.
+    fields = {}
+    if likes > 0 or comments > 0:
+        fields["trending_score"] = trending.engagement(
+            likes=max(likes, 0), comments=max(comments, 0)
+        )
+    Post.objects.filter(id=post_id).update(
+        like_count=F("like_count") + likes,
+        comment_count=F("comment_count") + comments,
+        **fields,
+    )
+    response_cache.invalidate("post", post_id)
+    if comments:
+        response_cache.invalidate("post-comments", post_id)
+
+
+# Inserts the likes that do not exist yet and bumps like_count and the
+# trending score (see trending.add_score) of exactly those posts in one
+# statement; the unique (user, post) constraint resolves concurrent likes.
+# Returns every requested post that exists, with its new like if one was
+# inserted.
+LIKE_UPSERT_SQL = """
+WITH inserted AS (
+    INSERT INTO {like} ({like_user}, {like_post}, {like_created})
+    SELECT %(user_id)s, {post_id}, %(now)s FROM {post}
+    WHERE {post_id} = ANY(%(post_ids)s)
+    ON CONFLICT ({like_user}, {like_post}) DO NOTHING
+    RETURNING {like_id}, {like_post}, {like_created}
+), counted AS (
+    UPDATE {post} SET {like_count} = {post}.{like_count} + 1,
+        {trending_score} = GREATEST({post}.{trending_score}, %(score)s)
+            + LN(1 + EXP(-LEAST(ABS({post}.{trending_score} - %(score)s), 700)))
+    FROM inserted WHERE {post}.{post_id} = inserted.{like_post}
+)
+SELECT post.{post_id}, post.{post_content}, author.{user_id}, author.{username},
+    inserted.{like_id}, inserted.{like_created}
+FROM {post} post
+JOIN {user} author ON author.{user_id} = post.{post_author}
+LEFT JOIN inserted ON inserted.{like_post} = post.{post_id}
+WHERE post.{post_id} = ANY(%(post_ids)s)
+"""
+
+
+def get_like_upsert_sql():
+    def table(model):
+        return connection.ops.quote_name(model._meta.db_table)
+
+    def column(model, name):
+        return connection.ops.quote_name(model._meta.get_field(name).column)
+
+    return LIKE_UPSERT_SQL.format(
+        like=table(Like),
+        like_id=column(Like, "id"),
+        like_user=column(Like, "user"),
+        like_post=column(Like, "post"),
+        like_created=column(Like, "created_at"),
+        post=table(Post),
+        post_id=column(Post, "id"),
+        post_content=column(Post, "content"),
+        post_author=column(Post, "author"),
+        like_count=column(Post, "like_count"),
+        trending_score=column(Post, "trending_score"),
+        user=table(CustomUser),
+        user_id=column(CustomUser, "id"),
+        username=column(CustomUser, "username"),
+    )
+
+
+def insert_likes(user, post_ids):
+    # Returns {post_id: (post, like)} for the posts that exist; like is None
+    # when the user had already liked the post.
+    if connection.vendor != "postgresql":
+        return insert_likes_one_by_one(user, post_ids)
+
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            get_like_upsert_sql(),
+            {
+                "user_id": user.id,
+                "post_ids": list(post_ids),
+                "now": now,
+                "score": trending.event_score(settings.TRENDING_LIKE_WEIGHT, now),
+            },
+        )
+        rows = cursor.fetchall()
+
+    results = {}
+    for post_id, content, author_id, username, like_id, created_at in rows:
+        author = CustomUser.from_db(
+            connection.alias, ["id", "username"], [author_id, username]
+        )
+        post = Post.from_db(
+            connection.alias, ["id", "content", "author"], [post_id, content, author_id]
+        )
+        post.author = author
+        like = None
+        if like_id is not None:
+            like = Like(id=like_id, user=user, post=post, created_at=created_at)
+            like._state.adding = False
+            response_cache.invalidate("post", post_id)
+        results[post_id] = (post, like)
+    return results
+
+
+def insert_likes_one_by_one(user, post_ids):
+    posts = Post.objects.select_related("author").in_bulk(post_ids)
+    results = {}
+    for post_id, post in posts.items():
+        like = None
+        try:
+            with transaction.atomic():
+                like = Like.objects.create(user=user, post=post)
+                update_post_counters(post_id, likes=1)
+        except IntegrityError:
+            like = None
+        results[post_id] = (post, like)
+    return results
+
+
+def rebuild_post_counters(posts=None):
+    posts = Post.objects.all() if posts is None else posts
+    likes = (
+        Like.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    comments = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return posts.update(
+        like_count=Coalesce(Subquery(likes), 0),
+        comment_count=Coalesce(Subquery(comments), 0),
+    )
@@ -0,0 +1,129 @@
+import abc
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.NOTIFICATION_BROKER)()
+    return _broker
+
+
+class Broker(abc.ABC):
+    """
+    Delivers notification events to connected recipients.
+
+    publish() is called from synchronous code (requests, fan-out threads or
+    workers); subscribe() is used by the streaming view on the event loop. A
+    shared implementation (Redis pub/sub, PostgreSQL LISTEN/NOTIFY) lets a
+    fan-out worker reach clients connected to other processes.
+    """
+
+    @abc.abstractmethod
+    def publish(self, user_ids, event):
+        pass
+
+    @abc.abstractmethod
+    def subscribe(self, user_id):
+        pass
+
+    @abc.abstractmethod
+    def unsubscribe(self, user_id, subscription):
+        pass
+
+
+class Subscription:
+    def __init__(self, loop, max_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that stopped reading misses events rather than
+            # growing the queue; it can catch up from the inbox.
+            pass
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InProcessBroker(Broker):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [
+                subscription
+                for user_id in user_ids
+                for subscription in self._subscriptions.get(user_id, ())
+            ]
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(
+            asyncio.get_running_loop(), settings.NOTIFICATION_STREAM_QUEUE_SIZE
+        )
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[user_id]
+
+
+def format_event(event):
+    return f"event: notification\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(user_id):
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await subscription.get(settings.NOTIFICATION_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(user_id, subscription)
+
+
+def authenticate_stream(request):
+    # EventSource cannot send headers, so the access token may also be
+    # passed as ?token=.
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is not None:
+        raw_token = authentication.get_raw_token(header)
+    else:
+        raw_token = request.GET.get("token")
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(token)
+    except (AuthenticationFailed, InvalidToken):
+        return None
@@ -0,0 +1,141 @@
+from itertools import chain
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy import sparse
+from .models import Follow, FollowRecommendation
+
+
+def load_follow_graph(chunk_size=10000):
+    # Returns the sorted user ids and a CSR adjacency matrix over their
+    # positions in it: graph[i, j] == 1 when user_ids[i] follows user_ids[j].
+    rows = (
+        Follow.objects.order_by()
+        .values_list("follower_id", "following_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    edges = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    user_ids, positions = np.unique(edges, return_inverse=True)
+    positions = positions.reshape(-1, 2)
+    graph = sparse.csr_matrix(
+        (
+            np.ones(len(positions), dtype=np.int32),
+            (positions[:, 0], positions[:, 1]),
+        ),
+        shape=(len(user_ids), len(user_ids)),
+    )
+    return user_ids, graph
+
+
+def count_mutuals(graph, start, stop):
+    # counts[i, j]: how many users followed by user start + i follow user j,
+    # leaving out j that user start + i already follows or is.
+    following = graph[start:stop]
+    counts = following @ graph
+    own = sparse.csr_matrix(
+        (
+            np.ones(stop - start, dtype=np.int32),
+            (np.arange(stop - start), np.arange(start, stop)),
+        ),
+        shape=counts.shape,
+    )
+    counts = counts - counts.multiply((following + own) > 0)
+    counts.eliminate_zeros()
+    return counts
+
+
+def top_candidates(counts, limit, min_mutual):
+    # Returns the rows, candidate positions and mutual counts of the limit
+    # best candidates of every row, ties going to the lowest position.
+    counts.data[counts.data < min_mutual] = 0
+    counts.eliminate_zeros()
+    rows, candidates, mutuals = [], [], []
+    for row in range(counts.shape[0]):
+        begin, end = counts.indptr[row], counts.indptr[row + 1]
+        best = np.lexsort((counts.indices[begin:end], -counts.data[begin:end]))
+        best = best[:limit] + begin
+        rows.append(np.full(len(best), row))
+        candidates.append(counts.indices[best])
+        mutuals.append(counts.data[best])
+    return np.concatenate(rows), np.concatenate(candidates), np.concatenate(mutuals)
+
+
+# One statement for a whole block of users, with the columns sent as arrays;
+# building and saving a model instance per row would dominate the run.
+RECOMMENDATION_INSERT_SQL = """
+INSERT INTO {table} ({user}, {candidate}, {mutual_count}, {generated_at})
+SELECT user_id, candidate_id, mutual_count, %(generated_at)s
+FROM unnest(%(user_ids)s::bigint[], %(candidate_ids)s::bigint[],
+    %(mutual_counts)s::integer[]) AS rows (user_id, candidate_id, mutual_count)
+"""
+
+
+def get_recommendation_insert_sql():
+    def column(name):
+        field = FollowRecommendation._meta.get_field(name)
+        return connection.ops.quote_name(field.column)
+
+    return RECOMMENDATION_INSERT_SQL.format(
+        table=connection.ops.quote_name(FollowRecommendation._meta.db_table),
+        user=column("user"),
+        candidate=column("candidate"),
+        mutual_count=column("mutual_count"),
+        generated_at=column("generated_at"),
+    )
+
+
+def insert_recommendations(user_ids, candidate_ids, mutual_counts, generated_at):
+    if connection.vendor != "postgresql":
+        FollowRecommendation.objects.bulk_create(
+            [
+                FollowRecommendation(
+                    user_id=user_id,
+                    candidate_id=candidate_id,
+                    mutual_count=mutual_count,
+                    generated_at=generated_at,
+                )
+                for user_id, candidate_id, mutual_count in zip(
+                    user_ids, candidate_ids, mutual_counts
+                )
+            ],
+            batch_size=5000,
+        )
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            get_recommendation_insert_sql(),
+            {
+                "user_ids": user_ids,
+                "candidate_ids": candidate_ids,
+                "mutual_counts": mutual_counts,
+                "generated_at": generated_at,
+            },
+        )
+
+
+def generate_recommendations(limit=50, min_mutual=1, batch_size=1000):
+    # Replaces every user's stored recommendations with the limit users they
+    # do not follow yet that most of the users they follow follow.
+    started = timezone.now()
+    user_ids, graph = load_follow_graph()
+    stored = 0
+    for start in range(0, len(user_ids), batch_size):
+        stop = min(start + batch_size, len(user_ids))
+        counts = count_mutuals(graph, start, stop)
+        rows, candidates, mutuals = top_candidates(counts, limit, min_mutual)
+        with transaction.atomic():
+            FollowRecommendation.objects.filter(
+                user_id__in=user_ids[start:stop].tolist()
+            ).delete()
+            insert_recommendations(
+                user_ids[rows + start].tolist(),
+                user_ids[candidates].tolist(),
+                mutuals.tolist(),
+                started,
+            )
+        stored += len(rows)
+
+    # Users who no longer follow anyone.
+    FollowRecommendation.objects.filter(generated_at__lt=started).delete()
+    return len(user_ids), stored
@@ -0,0 +1,92 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+# Every cached response key embeds the version of the object it renders and a
+# global generation. Invalidating bumps a version, which orphans every page
+# cached for that object at once; the orphans expire with their timeout.
+GENERATION_KEY = "response:generation"
+NAMESPACES = ("post", "post-comments", "user", "profile")
+
+
+def version_key(namespace, pk):
+    return f"response:version:{namespace}:{pk}"
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def invalidate(namespace, pk):
+    bump(version_key(namespace, pk))
+
+
+def invalidate_all():
+    bump(GENERATION_KEY)
+
+
+def response_key(namespace, pk, url):
+    keys = cache.get_many([GENERATION_KEY, version_key(namespace, pk)])
+    generation = keys.get(GENERATION_KEY, 1)
+    version = keys.get(version_key(namespace, pk), 1)
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f"response:{namespace}:{pk}:{generation}:{version}:{digest}"
+
+
+def record(namespace, outcome):
+    key = f"response:{outcome}:{namespace}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_stats():
+    keys = [
+        f"response:{outcome}:{namespace}"
+        for namespace in NAMESPACES
+        for outcome in ("hits", "misses")
+    ]
+    counters = cache.get_many(keys)
+    return {
+        namespace: {
+            outcome: counters.get(f"response:{outcome}:{namespace}", 0)
+            for outcome in ("hits", "misses")
+        }
+        for namespace in NAMESPACES
+    }
+
+
+def lookup(namespace, pk, url):
+    key = response_key(namespace, pk, url)
+    data = cache.get(key)
+    record(namespace, "misses" if data is None else "hits")
+    return key, data
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+    cache_lookup_kwarg = "pk"
+    # A page filled from a lagging replica would stay cached after the
+    # invalidation that preceded it.
+    use_primary = True
+
+    def get(self, request, *args, **kwargs):
+        # Authentication and permissions have already run in initial().
+        key, data = lookup(
+            self.cache_namespace,
+            self.kwargs[self.cache_lookup_kwarg],
+            request.build_absolute_uri(),
+        )
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+
+def get_search_ordering(keyword=None):
+    if keyword:
+        return ("-rank", "-timestamp", "-id")
+    return ("-timestamp", "-id")
+
+
+def search_posts(posts, keyword=None, date=None, time=None):
+    if date:
+        posts = posts.filter(timestamp__date=date)
+    if time:
+        posts = posts.filter(timestamp__time=time)
+    if keyword:
+        query = SearchQuery(keyword, config="english", search_type="websearch")
+        # Full-text matches are ranked first; the trigram index on content
+        # picks up substrings that are not whole words ("gram" in "Instagram").
+        posts = posts.filter(
+            Q(search_vector=query) | Q(content__icontains=keyword)
+        ).annotate(
+            # ts_rank() is a real; as a double it survives the round trip
+            # through keyset cursors exactly.
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+    return posts.order_by(*get_search_ordering(keyword))
@@ -1,6 +1,19 @@
 from datetime import datetime
+from django.conf import settings
 from rest_framework import serializers
-from .models import CustomUser, Profile, Post, Comment, Like, Notification, Follow
+from .models import (
+    CustomUser,
+    Profile,
+    Post,
+    Comment,
+    Like,
+    Notification,
+    Follow,
+    FollowRecommendation,
+    UploadSession,
+)
+from . import derivatives
+from .uploads import MAX_PARTS, create_session, get_progress
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -48,7 +61,18 @@ class UpdateUserSerializer(serializers.ModelSerializer):
 class UpdateProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
-        exclude = ["user"]
+        exclude = ["user", "fanout_on_read"]
+        read_only_fields = ["follower_count", "following_count", "derivatives"]
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation["derivatives"] = derivatives.get_urls(
+            "profile",
+            instance.profile_picture.name,
+            instance.derivatives,
+            self.context.get("request"),
+        )
+        return representation
 
     def update(self, instance, validated_data):
         authenticated_user = self.context.get("request").user
@@ -56,7 +80,9 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
         if authenticated_user == profile_owner:
             bio = validated_data.get("bio", instance.bio)
             instance.bio = bio
-            instance.save()
+            # Saving every field would write back counters read before
+            # concurrent follows.
+            instance.save(update_fields=["bio"])
             return instance
         raise serializers.ValidationError(
             {"detail": "You are not authorized to modify this profile."}
@@ -67,7 +93,8 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
 class ListPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
-        fields = "__all__"
+        exclude = ["search_vector", "trending_score"]
+        read_only_fields = ["like_count", "comment_count", "derivatives"]
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -75,6 +102,12 @@ class ListPostSerializer(serializers.ModelSerializer):
         representation["timestamp"] = datetime.strftime(
             instance.timestamp, "%Y-%m-%d %H:%M"
         )
+        representation["derivatives"] = derivatives.get_urls(
+            "post",
+            instance.media.name,
+            instance.derivatives,
+            self.context.get("request"),
+        )
         representation["author_name"] = str(instance.author)
 
         return representation
@@ -83,7 +116,8 @@ class ListPostSerializer(serializers.ModelSerializer):
 class CreatePostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
-        exclude = ["author"]
+        exclude = ["author", "search_vector", "trending_score", "derivatives"]
+        read_only_fields = ["like_count", "comment_count"]
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -97,7 +131,8 @@ class CreatePostSerializer(serializers.ModelSerializer):
 class UpdateDeletePostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
-        exclude = ["author"]
+        exclude = ["author", "search_vector", "trending_score", "derivatives"]
+        read_only_fields = ["like_count", "comment_count"]
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -112,7 +147,9 @@ class UpdateDeletePostSerializer(serializers.ModelSerializer):
         if authenticated_user == instance.author:
             content = validated_data.get("content", instance.content)
             instance.content = content
-            instance.save()
+            # Counters and trending_score are updated in place by concurrent
+            # likes and comments.
+            instance.save(update_fields=["content"])
             return instance
         raise serializers.ValidationError(
             {"detail": "You are not authorized to modify this post."}
@@ -208,6 +245,17 @@ class ListCreateDeleteLikeSerializer(serializers.ModelSerializer):
         return representation
 
 
+class BatchLikeSerializer(serializers.Serializer):
+    post_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_ITEMS,
+    )
+
+    def validate_post_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
 # FOLLOW RELATED SERIALIZERS
 class ListCreateFollowSerializer(serializers.ModelSerializer):
     class Meta:
@@ -240,6 +288,28 @@ class DeleteFollowSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class BatchFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_ITEMS,
+    )
+
+    def validate_user_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class FollowRecommendationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FollowRecommendation
+        fields = ["candidate", "mutual_count"]
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation["candidate_name"] = str(instance.candidate)
+        return representation
+
+
 # NOTIFICATIONS RELATED SERIALIZERS
 class ListNotificationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -263,3 +333,78 @@ class ListNotificationSerializer(serializers.ModelSerializer):
             representation["comment"] = str(instance.comment)
 
         return representation
+
+
+class InboxNotificationSerializer(ListNotificationSerializer):
+    class Meta:
+        model = Notification
+        fields = [
+            "id",
+            "recipient",
+            "sender",
+            "notification_type",
+            "created_at",
+            "read",
+        ]
+
+
+class MarkNotificationsReadSerializer(serializers.Serializer):
+    up_to = serializers.IntegerField(required=False, min_value=1)
+
+
+# UPLOAD RELATED SERIALIZERS
+class UploadSessionSerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(min_value=1, max_value=settings.UPLOAD_MAX_SIZE)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "target",
+            "filename",
+            "content_type",
+            "size",
+            "content",
+            "part_size",
+            "status",
+            "created_at",
+            "expires_at",
+        ]
+        read_only_fields = ["part_size", "status", "expires_at"]
+
+    def validate(self, data):
+        if data["target"] == UploadSession.POST:
+            if not data.get("content"):
+                raise serializers.ValidationError({"content": "A post needs content."})
+        elif not data["content_type"].startswith("image/"):
+            raise serializers.ValidationError(
+                {"content_type": "A profile picture must be an image."}
+            )
+        else:
+            data["content"] = ""
+        return data
+
+    def create(self, validated_data):
+        return create_session(**validated_data)
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        representation["created_at"] = datetime.strftime(
+            instance.created_at, "%Y-%m-%d %H:%M"
+        )
+        if instance.status == UploadSession.PENDING:
+            request = self.context.get("request")
+            after = request.query_params.get("after", "0")
+            representation.update(
+                get_progress(instance, request, int(after) if after.isdigit() else 0)
+            )
+        return representation
+
+
+class UploadPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1, max_value=MAX_PARTS)
+    etag = serializers.CharField(max_length=255)
+
+
+class CompleteUploadSerializer(serializers.Serializer):
+    parts = UploadPartSerializer(many=True, allow_empty=False, max_length=MAX_PARTS)
@@ -1,45 +1,114 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Follow, Like, Comment, Notification, Post
+from .models import CustomUser, Follow, Like, Comment, Notification, Post, Profile
+from .fanout import enqueue_fanout
+from . import derivatives, media_store, response_cache, social_graph, timeline, trending
+from .inbox import invalidate_unread_counts
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance.trending_score = trending.event_score(settings.TRENDING_POST_WEIGHT)
 
 
 @receiver(post_save, sender=Post)
 def create_post_notification(sender, instance, created, **kwargs):
     if created:
-        user = instance.author
-        follow_instances = user.followers.all()
-        for follow_instance in follow_instances:
-            Notification.objects.create(
-                recipient=follow_instance.follower,
-                sender=user,
-                notification_type="post",
-                post=instance,
-            )
+        enqueue_fanout("post", instance)
 
 
 @receiver(post_save, sender=Comment)
 def create_comment_notification(sender, instance, created, **kwargs):
     if created:
-        user = instance.author
-        follow_instances = user.followers.all()
-        for follow_instance in follow_instances:
-            Notification.objects.create(
-                recipient=follow_instance.follower,
-                sender=user,
-                notification_type="comment",
-                comment=instance,
-            )
+        enqueue_fanout("comment", instance)
 
 
 @receiver(post_save, sender=Follow)
 def create_like_notification(sender, instance, created, **kwargs):
     if created:
-        user = instance.follower
-        follow_instances = user.followers.all()
-        for follow_instance in follow_instances:
-            Notification.objects.create(
-                recipient=follow_instance.follower,
-                sender=user,
-                notification_type="follow",
-                follow=instance,
-            )
+        enqueue_fanout("follow", instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        social_graph.update_follow_counters(
+            instance.follower_id, instance.following_id, 1
+        )
+        social_graph.invalidate_follows(instance.follower_id, [instance.following_id])
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    social_graph.update_follow_counters(instance.follower_id, instance.following_id, -1)
+    social_graph.invalidate_follows(instance.follower_id, [instance.following_id])
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_timeline(sender, instance, created, **kwargs):
+    if created and settings.TIMELINE_ENABLED:
+        timeline.backfill_timeline(instance.follower_id, [instance.following_id])
+
+
+@receiver(post_delete, sender=Follow)
+def remove_unfollowed_posts_from_timeline(sender, instance, **kwargs):
+    if settings.TIMELINE_ENABLED:
+        timeline.remove_from_timeline(instance.follower_id, [instance.following_id])
+
+
+@receiver(post_save, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    # Comment pages describe their post too.
+    response_cache.invalidate("post", instance.pk)
+    response_cache.invalidate("post-comments", instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_media(sender, instance, **kwargs):
+    if instance.media:
+        media_store.release(instance.media.name, instance.derivatives)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    response_cache.invalidate("post", instance.pk)
+    response_cache.invalidate("post-comments", instance.pk)
+
+
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_count(sender, instance, **kwargs):
+    # Also sent for notifications deleted with their post, comment or follow.
+    if not instance.read:
+        invalidate_unread_counts([instance.recipient_id])
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_cached_comments(sender, instance, **kwargs):
+    response_cache.invalidate("post-comments", instance.post_id)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    response_cache.invalidate("profile", instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_user(sender, instance, created, **kwargs):
+    if not created:
+        # Usernames are rendered into other users' cached pages too.
+        response_cache.invalidate("user", instance.pk)
+        response_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Post)
+def generate_post_derivatives(sender, instance, update_fields, **kwargs):
+    if derivatives.is_stale(instance, "media", update_fields):
+        derivatives.schedule("post", instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def generate_profile_derivatives(sender, instance, update_fields, **kwargs):
+    if derivatives.is_stale(instance, "profile_picture", update_fields):
+        derivatives.schedule("profile", instance.pk)
@@ -0,0 +1,212 @@
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from .models import Follow, Profile
+from . import response_cache
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+# relation: (Follow field naming the user, Follow field holding the ids,
+# Profile counter of the set's size)
+RELATIONS = {
+    FOLLOWING: ("follower_id", "following_id", "following_count"),
+    FOLLOWERS: ("following_id", "follower_id", "follower_count"),
+}
+
+_follow_sets = None
+
+
+class FollowSetCache:
+    """
+    Least recently used follow sets of this process, as sorted array("q")
+    of user ids, holding at most max_ids ids in total. Each set is stored
+    with the version token it was loaded under; a changed token in the shared
+    cache means another process saw a follow change and the copy is stale.
+    Sets are also dropped ttl seconds after loading, which bounds how stale
+    they get when the cache is not shared by every process.
+    """
+
+    def __init__(self, max_ids, ttl):
+        self.max_ids = max_ids
+        self.ttl = ttl
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            if entry[1] <= time.monotonic():
+                self.pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, version, ids):
+        with self.lock:
+            self.pop(key)
+            self.entries[key] = (version, time.monotonic() + self.ttl, ids)
+            self.size += len(ids)
+            while self.size > self.max_ids and len(self.entries) > 1:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard(self, key):
+        with self.lock:
+            self.pop(key)
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+
+def get_follow_sets():
+    global _follow_sets
+    if _follow_sets is None:
+        _follow_sets = FollowSetCache(
+            settings.SOCIAL_GRAPH_CACHE_IDS, settings.SOCIAL_GRAPH_CACHE_TTL
+        )
+    return _follow_sets
+
+
+def version_key(relation, user_id):
+    return f"graph:{relation}:{user_id}"
+
+
+def get_version(relation, user_id):
+    # Random tokens rather than counters: a token evicted from the shared
+    # cache comes back as a new one, never as a value a stale copy holds.
+    key = version_key(relation, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def load_ids(relation, user_id):
+    user_field, id_field, counter = RELATIONS[relation]
+    limit = settings.SOCIAL_GRAPH_MAX_SET_SIZE
+    count = Profile.objects.filter(user_id=user_id).values_list(counter, flat=True)
+    if (count.first() or 0) > limit:
+        return None
+    ids = array(
+        "q",
+        Follow.objects.filter(**{user_field: user_id})
+        .order_by(id_field)
+        .values_list(id_field, flat=True)[: limit + 1],
+    )
+    return ids if len(ids) <= limit else None
+
+
+def get_ids(relation, user_id):
+    # Sorted ids, or None when the set is too large to cache.
+    key = (relation, user_id)
+    version = get_version(relation, user_id)
+    ids = get_follow_sets().get(key, version)
+    if ids is None:
+        ids = load_ids(relation, user_id)
+        if ids is not None:
+            get_follow_sets().put(key, version, ids)
+    return ids
+
+
+def following_of(user_id):
+    # Usable in an __in lookup: the cached ids, or a subquery for users who
+    # follow more than SOCIAL_GRAPH_MAX_SET_SIZE others.
+    ids = get_ids(FOLLOWING, user_id)
+    if ids is None:
+        return Follow.objects.filter(follower_id=user_id).values("following_id")
+    return ids
+
+
+def iter_follower_ids(user_id, after=0, chunk_size=1000):
+    # Follower ids greater than after, in ascending order.
+    ids = get_ids(FOLLOWERS, user_id)
+    if ids is None:
+        return (
+            Follow.objects.filter(following_id=user_id, follower_id__gt=after)
+            .order_by("follower_id")
+            .values_list("follower_id", flat=True)
+            .iterator(chunk_size=chunk_size)
+        )
+    return iter(ids[bisect_right(ids, after) :])
+
+
+def is_following(follower_id, following_id):
+    ids = get_ids(FOLLOWING, follower_id)
+    if ids is None:
+        return Follow.objects.filter(
+            follower_id=follower_id, following_id=following_id
+        ).exists()
+    index = bisect_left(ids, following_id)
+    return index < len(ids) and ids[index] == following_id
+
+
+def invalidate_follows(follower_id, following_ids):
+    # After commit, so that no process reloads the old set under the new
+    # version.
+    keys = [(FOLLOWING, follower_id)]
+    keys += [(FOLLOWERS, following_id) for following_id in following_ids]
+
+    def invalidate():
+        cache.set_many({version_key(*key): uuid.uuid4().hex for key in keys}, None)
+        for key in keys:
+            get_follow_sets().discard(key)
+
+    transaction.on_commit(invalidate)
+
+
+def invalidate_profiles(user_ids):
+    profiles = Profile.objects.filter(user_id__in=user_ids)
+    for profile_id in profiles.values_list("id", flat=True):
+        response_cache.invalidate("profile", profile_id)
+
+
+def update_follow_counters(follower_id, following_id, delta):
+    def adjusted(field, user_id):
+        change = Case(When(user_id=user_id, then=Value(delta)), default=Value(0))
+        return Greatest(F(field) + change, Value(0))
+
+    Profile.objects.filter(user_id__in=[follower_id, following_id]).update(
+        following_count=adjusted("following_count", follower_id),
+        follower_count=adjusted("follower_count", following_id),
+    )
+    invalidate_profiles([follower_id, following_id])
+
+
+def rebuild_follow_counters(profiles=None):
+    profiles = Profile.objects.all() if profiles is None else profiles
+
+    def total(field):
+        return Coalesce(
+            Subquery(
+                Follow.objects.filter(**{field: OuterRef("user")})
+                .order_by()
+                .values(field)
+                .annotate(total=Count("id"))
+                .values("total")
+            ),
+            0,
+        )
+
+    return profiles.update(
+        follower_count=total("following"), following_count=total("follower")
+    )
+
+
+def refresh_follow_counters(user_ids):
+    rebuild_follow_counters(Profile.objects.filter(user_id__in=user_ids))
+    invalidate_profiles(user_ids)
@@ -1,3 +1,562 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from array import array
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from . import async_views, batch, benchmarking, fanout, imaging, uploads, views
+from .inbox import get_unread_count
+from .models import (
+    Comment,
+    CustomUser,
+    FanoutJob,
+    Follow,
+    FollowRecommendation,
+    Like,
+    Notification,
+    Post,
+    Profile,
+    TimelineEntry,
+    UploadSession,
+)
+from .social_graph import FollowSetCache
 
-# Create your tests here.
+
+# Fan-out runs in the test's thread, rather than in pool threads that would
+# hold connections to the test database.
+fanout_settings = override_settings(NOTIFICATION_FANOUT_BACKEND="sync")
+
+
+def setUpModule():
+    fanout_settings.enable()
+
+
+def tearDownModule():
+    fanout_settings.disable()
+
+
+def create_user(username):
+    user = CustomUser.objects.create_user(username, f"{username}@example.com", "pw")
+    Profile.objects.create(user=user)
+    return user
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user("reader")
+        cls.author = create_user("author")
+        Follow.objects.create(follower=cls.reader, following=cls.author)
+        Post.objects.create(author=cls.author, content="followed")
+
+    def get(self, view_class, name):
+        token = AccessToken.for_user(self.reader)
+        request = AsyncRequestFactory().get(
+            reverse(name), headers={"Authorization": f"Bearer {token}"}
+        )
+        return view_class.as_view()(request)
+
+    async def test_list_posts(self):
+        response = await self.get(async_views.AsyncListPostView, "async_list_post")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post["content"] for post in response.data["results"]], ["followed"]
+        )
+
+    async def test_list_notifications(self):
+        response = await self.get(
+            async_views.AsyncListNotification, "async_list_notification"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(NOTIFICATION_FANOUT_RETRY_DELAY=30)
+class FanoutRetryTests(TestCase):
+    def setUp(self):
+        author = create_user("author")
+        post = Post.objects.create(author=author, content="Fanned out")
+        # Queued by the post's post_save, and left pending by the test's
+        # transaction.
+        self.job = FanoutJob.objects.get(idempotency_key=f"post:{post.id}")
+        failing = {**fanout.HANDLERS, "post": mock.Mock(side_effect=Exception)}
+        self.enterContext(mock.patch.object(fanout, "HANDLERS", failing))
+        self.retry = self.enterContext(mock.patch.object(fanout, "retry_in_thread"))
+        self.enterContext(self.assertLogs("main.fanout", "ERROR"))
+
+    def test_thread_backend_retries(self):
+        with override_settings(NOTIFICATION_FANOUT_BACKEND="thread"):
+            self.assertFalse(fanout.run_job(self.job.id))
+        self.retry.assert_called_once_with(self.job.id, 30)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, FanoutJob.PENDING)
+
+    def test_last_attempt(self):
+        FanoutJob.objects.filter(id=self.job.id).update(
+            attempts=settings.NOTIFICATION_FANOUT_MAX_ATTEMPTS - 1
+        )
+        with override_settings(NOTIFICATION_FANOUT_BACKEND="thread"):
+            fanout.run_job(self.job.id)
+        self.retry.assert_not_called()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, FanoutJob.FAILED)
+
+
+class ResponseCacheTests(TestCase):
+    def test_post_edit_invalidates_comment_pages(self):
+        cache.clear()
+        user = create_user("commenter")
+        post = Post.objects.create(author=user, content="Before the edit")
+        Comment.objects.create(post=post, author=user, content="A comment")
+
+        def comment_page():
+            response = benchmarking.call_view(
+                views.ListCommentView.as_view(), user, "/", post_id=post.id
+            )
+            return response.content.decode()
+
+        self.assertIn("Before the edit", comment_page())
+        post.content = "After the edit"
+        post.save()
+        self.assertIn("After the edit", comment_page())
+
+
+class UnreadCountTests(TestCase):
+    def test_cascade_delete(self):
+        cache.clear()
+        author, reader = create_user("author"), create_user("reader")
+        post = Post.objects.create(author=author, content="Noticed")
+        Notification.objects.create(
+            recipient=reader, sender=author, notification_type="post", post=post
+        )
+        self.assertEqual(get_unread_count(reader), 1)
+        post.delete()
+        self.assertEqual(get_unread_count(reader), 0)
+
+
+class NotificationStreamTests(TestCase):
+    def test_wsgi(self):
+        user = create_user("listener")
+        token = AccessToken.for_user(user)
+        response = self.client.get(
+            reverse("notification_stream"),
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 501)
+
+
+class FollowSetCacheTests(SimpleTestCase):
+    def test_version_change(self):
+        sets = FollowSetCache(max_ids=10, ttl=60)
+        sets.put("key", "v1", array("q", [1, 2]))
+        self.assertEqual(list(sets.get("key", "v1")), [1, 2])
+        self.assertIsNone(sets.get("key", "v2"))
+
+    def test_expiry(self):
+        sets = FollowSetCache(max_ids=10, ttl=0)
+        sets.put("key", "v1", array("q", [1, 2]))
+        self.assertIsNone(sets.get("key", "v1"))
+        self.assertEqual(sets.size, 0)
+
+
+def image_bytes(size=(800, 600), format="JPEG"):
+    output = io.BytesIO()
+    Image.new("RGB", size, "red").save(output, format)
+    return output.getvalue()
+
+
+class ImagingTests(SimpleTestCase):
+    specs = [("avatar_48", 48, True), ("thumbnail_320", 320, False)]
+
+    def render(self, data):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "source")
+            with open(path, "wb") as file:
+                file.write(data)
+            return [
+                (name, Image.open(output).size)
+                for name, output in imaging.render(path, self.specs, 80, directory)
+            ]
+
+    def test_render(self):
+        self.assertEqual(
+            self.render(image_bytes()),
+            [("avatar_48", (48, 48)), ("thumbnail_320", (320, 240))],
+        )
+
+    def test_corrupt_images(self):
+        data = image_bytes()
+        self.assertEqual(self.render(data[: len(data) // 3]), [])
+        self.assertEqual(self.render(b"not an image"), [])
+
+
+class QueryBudgetTests(TestCase):
+    # Queries for one page of each list endpoint, the same for a single row
+    # and for a full page. Nothing is cached: endpoints that read the user's
+    # follow set spend two queries loading it.
+    rows = 10
+    budgets = {
+        "list_create_user": (views.ListCreateUserView, {}, {}, 2),
+        "list_post": (views.ListPostView, {}, {}, 4),
+        "list_post_by_likes": (views.ListPostView, {}, {"sort_by": "likes"}, 4),
+        "list_post_cursor": (views.ListPostView, {}, {"pagination": "cursor"}, 3),
+        "list_post_trending": (views.ListPostView, {}, {"sort_by": "trending"}, 4),
+        "trending_post": (views.TrendingPostView, {}, {}, 1),
+        "search_post": (views.SearchPostView, {}, {"keyword": "Benchmark"}, 2),
+        "list_comment": (views.ListCommentView, {"post_id": None}, {}, 2),
+        "create_comment": (views.CreateCommentView, {}, {}, 2),
+        "list_like": (views.ListCreateLikeView, {}, {}, 2),
+        "list_follow": (views.ListCreateFollowView, {}, {}, 2),
+        "list_follower": (views.ListFollowerView, {}, {}, 2),
+        "list_notification": (views.ListNotification, {}, {}, 4),
+        "notification_inbox": (views.ListInboxView, {}, {}, 2),
+        "recommendations": (views.ListRecommendationView, {}, {}, 3),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = benchmarking.seed_users(1, prefix="reader")[0]
+        authors = benchmarking.seed_users(cls.rows, prefix="author")
+        follows = benchmarking.seed_follows(cls.reader, authors)
+        Follow.objects.bulk_create(
+            [Follow(follower=author, following=cls.reader) for author in authors]
+        )
+        posts = benchmarking.seed_posts(authors, 1)
+        cls.post = posts[0]
+        Like.objects.bulk_create([Like(user=cls.reader, post=post) for post in posts])
+        Comment.objects.bulk_create(
+            [Comment(post=post, author=cls.reader, content="") for post in posts]
+        )
+        comments = Comment.objects.bulk_create(
+            [Comment(post=cls.post, author=author, content="") for author in authors]
+        )
+        Notification.objects.bulk_create(
+            Notification(
+                recipient=cls.reader,
+                sender=author,
+                notification_type=notification_type,
+                **{notification_type: target},
+            )
+            for author, post, comment, follow in zip(authors, posts, comments, follows)
+            for notification_type, target in (
+                ("post", post),
+                ("comment", comment),
+                ("follow", follow),
+            )
+        )
+        candidates = benchmarking.seed_users(cls.rows, prefix="candidate")
+        FollowRecommendation.objects.bulk_create(
+            FollowRecommendation(
+                user=cls.reader,
+                candidate=candidate,
+                mutual_count=1,
+                generated_at=timezone.now(),
+            )
+            for candidate in candidates
+        )
+
+    def test_budgets(self):
+        for name, (view, kwargs, params, budget) in self.budgets.items():
+            if "post_id" in kwargs:
+                kwargs = {"post_id": self.post.id}
+            with self.subTest(name):
+                # Drops cached responses and the follow sets' version tokens.
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    response = benchmarking.call_view(
+                        view.as_view(), self.reader, "/", data=params, **kwargs
+                    )
+                self.assertEqual(response.status_code, 200)
+
+
+class SingleRowQueryBudgetTests(QueryBudgetTests):
+    rows = 1
+
+
+class ConcurrentLikeTests(TransactionTestCase):
+    # The threads use their own connections, so the data must be committed.
+    threads = 8
+    rounds = 5
+
+    def like_at_once(self, user, post):
+        view = views.ListCreateLikeView.as_view()
+        barrier = threading.Barrier(self.threads)
+        statuses = []
+
+        def like():
+            try:
+                barrier.wait()
+                response = benchmarking.call_view(
+                    view, user, "/", method="post", post_id=post.id
+                )
+                statuses.append(response.status_code)
+            except Exception as error:
+                statuses.append(repr(error))
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=like) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return statuses
+
+    def test_one_like_per_post(self):
+        user, author = benchmarking.seed_users(2, prefix="like")
+        for _ in range(self.rounds):
+            post = Post.objects.create(author=author, content="Liked at once")
+            statuses = self.like_at_once(user, post)
+            # One like is created; the others are refused as duplicates.
+            self.assertEqual(
+                sorted(statuses, key=str), [201] + [400] * (self.threads - 1)
+            )
+            self.assertEqual(Like.objects.filter(post=post).count(), 1)
+            post.refresh_from_db()
+            self.assertEqual(post.like_count, 1)
+
+
+class MediaTestCase(TestCase):
+    # Files go to a temporary directory, and chunked uploads to
+    # LocalUploadBackend, in parts of 1 KiB.
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.media_root = os.path.join(directory, "media")
+        self.upload_root = os.path.join(directory, "uploads")
+        storage = {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": self.media_root},
+        }
+        self.enterContext(
+            override_settings(
+                STORAGES={**settings.STORAGES, "default": storage},
+                UPLOAD_BACKEND="main.uploads.LocalUploadBackend",
+                UPLOAD_LOCAL_ROOT=self.upload_root,
+                UPLOAD_PART_SIZE=1024,
+                MEDIA_DERIVATIVES_BACKEND="sync",
+            )
+        )
+        uploads._backend = None
+        self.addCleanup(setattr, uploads, "_backend", None)
+        self.user = create_user("uploader")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_session(self, data, target="post", content_type="video/mp4"):
+        response = self.client.post(
+            reverse("create_upload"),
+            {
+                "target": target,
+                "filename": "upload.bin",
+                "content_type": content_type,
+                "size": len(data),
+                "content": "Uploaded in parts",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def put_part(self, url, data):
+        return APIClient().generic(
+            "PUT", url, data, content_type="application/octet-stream"
+        )
+
+    def upload(self, data, **kwargs):
+        # Every part of data, as listed to complete the session.
+        session = self.create_session(data, **kwargs)
+        parts = []
+        for url in session["urls"]:
+            number = url["part_number"]
+            response = self.put_part(
+                url["url"], data[(number - 1) * 1024 : number * 1024]
+            )
+            self.assertEqual(response.status_code, 200)
+            parts.append({"part_number": number, "etag": response["ETag"]})
+        return session["id"], parts
+
+    def complete(self, session_id, parts):
+        return self.client.post(
+            reverse("complete_upload", args=[session_id]),
+            {"parts": parts},
+            format="json",
+        )
+
+
+class UploadTests(MediaTestCase):
+    data = bytes(range(256)) * 10
+
+    def test_create_session(self):
+        session = self.create_session(self.data)
+        self.assertEqual(session["status"], UploadSession.PENDING)
+        self.assertEqual(session["part_size"], 1024)
+        self.assertEqual(session["part_count"], 3)
+        self.assertEqual(session["parts"], [])
+        self.assertEqual([url["part_number"] for url in session["urls"]], [1, 2, 3])
+
+    def test_part_signature(self):
+        url = self.create_session(self.data)["urls"][0]["url"]
+        self.assertEqual(self.put_part(url + "x", self.data[:1024]).status_code, 403)
+        response = self.put_part(url, self.data[:1024])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"])
+
+    def test_part_too_large(self):
+        url = self.create_session(self.data)["urls"][0]["url"]
+        self.assertEqual(self.put_part(url, self.data[:1025]).status_code, 400)
+
+    def test_resume(self):
+        session = self.create_session(self.data)
+        self.put_part(session["urls"][1]["url"], self.data[1024:2048])
+        response = self.client.get(
+            reverse("retrieve_abort_upload", args=[session["id"]])
+        )
+        self.assertEqual([part["part_number"] for part in response.data["parts"]], [2])
+        self.assertEqual([url["part_number"] for url in response.data["urls"]], [1, 3])
+
+    def test_complete(self):
+        session_id, parts = self.upload(self.data)
+        response = self.complete(session_id, parts[:2])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            UploadSession.objects.get(pk=session_id).status, UploadSession.PENDING
+        )
+
+        response = self.complete(session_id, parts)
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.data["id"])
+        self.assertEqual(post.content, "Uploaded in parts")
+        with post.media.open("rb") as media:
+            self.assertEqual(media.read(), self.data)
+        session = UploadSession.objects.get(pk=session_id)
+        self.assertEqual(session.status, UploadSession.COMPLETED)
+        self.assertEqual(session.post, post)
+        self.assertEqual(self.complete(session_id, parts).status_code, 400)
+
+    def test_complete_wrong_size(self):
+        session = self.create_session(self.data)
+        parts = []
+        for url in session["urls"]:
+            response = self.put_part(url["url"], self.data[:1000])
+            parts.append({"part_number": url["part_number"], "etag": response["ETag"]})
+        self.assertEqual(self.complete(session["id"], parts).status_code, 400)
+
+    def test_expiry(self):
+        session_id, parts = self.upload(self.data)
+        UploadSession.objects.filter(pk=session_id).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.complete(session_id, parts).status_code, 400)
+
+        call_command("clean_upload_sessions", stdout=io.StringIO())
+        self.assertFalse(UploadSession.objects.filter(pk=session_id).exists())
+        self.assertFalse(
+            os.path.exists(os.path.join(self.upload_root, session_id.replace("-", "")))
+        )
+
+
+class DerivativeTests(MediaTestCase):
+    def upload_and_complete(self, data, target="post"):
+        session_id, parts = self.upload(data, target=target, content_type="image/jpeg")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.complete(session_id, parts)
+        self.assertIn(response.status_code, (200, 201))
+        return response
+
+    def sizes(self, derivatives, storage):
+        sizes = {}
+        for key, name in derivatives.items():
+            if key != "source":
+                with storage.open(name) as file, Image.open(file) as image:
+                    sizes[key] = image.size
+        return sizes
+
+    def test_profile_picture(self):
+        self.upload_and_complete(image_bytes(), target="profile_picture")
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.derivatives["source"], profile.profile_picture.name)
+        self.assertEqual(
+            self.sizes(profile.derivatives, profile.profile_picture.storage),
+            {"avatar_48": (48, 48), "avatar_96": (96, 96), "avatar_256": (256, 256)},
+        )
+
+    def test_post_media(self):
+        first = Post.objects.get(pk=self.upload_and_complete(image_bytes()).data["id"])
+        second = Post.objects.get(pk=self.upload_and_complete(image_bytes()).data["id"])
+        self.assertEqual(first.media.name, second.media.name)
+        # Posts of the same file share its copies.
+        self.assertEqual(first.derivatives, second.derivatives)
+        self.assertEqual(first.derivatives["source"], first.media.name)
+        self.assertEqual(
+            self.sizes(first.derivatives, first.media.storage),
+            {
+                "thumbnail_320": (320, 240),
+                "thumbnail_640": (640, 480),
+                "thumbnail_1280": (800, 600),
+            },
+        )
+
+    def test_corrupt_image(self):
+        data = image_bytes()
+        response = self.upload_and_complete(data[: len(data) // 3])
+        post = Post.objects.get(pk=response.data["id"])
+        self.assertEqual(post.derivatives, {"source": post.media.name})
+
+
+@override_settings(TIMELINE_ENABLED=True)
+class BatchUnfollowTests(TestCase):
+    def setUp(self):
+        self.user = create_user("follower")
+        self.followed = [create_user(f"followed_{index}") for index in range(4)]
+        for user in self.followed:
+            Post.objects.create(author=user, content="On the timeline")
+            follow = Follow.objects.create(follower=self.user, following=user)
+            Notification.objects.create(
+                recipient=user,
+                sender=self.user,
+                notification_type="follow",
+                follow=follow,
+            )
+
+    def test_unfollow_users(self):
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(), 4)
+        cache.clear()
+        self.assertEqual([get_unread_count(user) for user in self.followed], [1] * 4)
+        ids = [user.id for user in self.followed]
+        _, one, _ = benchmarking.measure(
+            lambda: batch.unfollow_users(self.user, ids[:1])
+        )
+        _, three, _ = benchmarking.measure(
+            lambda: batch.unfollow_users(self.user, ids[1:])
+        )
+        self.assertEqual(one, three)
+
+        self.assertFalse(Follow.objects.filter(follower=self.user).exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual([get_unread_count(user) for user in self.followed], [0] * 4)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(Profile.objects.get(user=self.user).following_count, 0)
+        self.assertEqual(
+            list(
+                Profile.objects.filter(user__in=self.followed).values_list(
+                    "follower_count", flat=True
+                )
+            ),
+            [0] * 4,
+        )
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+from .models import Post, Profile, TimelineEntry
+from . import social_graph
+from .utils import chunked
+
+
+def is_high_fanout(author_id):
+    return Profile.objects.filter(
+        user_id=author_id, follower_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out_post(post):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=post.author_id, post=post, timestamp=post.timestamp)],
+        ignore_conflicts=True,
+    )
+    if is_high_fanout(post.author_id):
+        # Followers pick these posts up on read instead.
+        Profile.objects.filter(user_id=post.author_id, fanout_on_read=False).update(
+            fanout_on_read=True
+        )
+        return
+
+    follower_ids = social_graph.iter_follower_ids(
+        post.author_id, chunk_size=settings.TIMELINE_BATCH_SIZE
+    )
+    for batch in chunked(follower_ids, settings.TIMELINE_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post=post, timestamp=post.timestamp)
+                for user_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def backfill_timeline(user_id, author_ids):
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .exclude(author__profile__fanout_on_read=True)
+        .order_by("-timestamp")
+        .values_list("id", "timestamp")[: settings.TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, timestamp=timestamp)
+            for post_id, timestamp in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timelines([user_id])
+
+
+def remove_from_timeline(user_id, author_ids):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=author_ids
+    ).delete()
+
+
+def trim_timelines(user_ids):
+    position = Window(
+        RowNumber(),
+        partition_by=F("user_id"),
+        order_by=[F("timestamp").desc(), F("post_id").desc()],
+    )
+    stale_ids = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .annotate(position=position)
+        .filter(position__gt=settings.TIMELINE_MAX_LENGTH)
+        .values_list("id", flat=True)
+    )
+    return TimelineEntry.objects.filter(id__in=list(stale_ids)).delete()[0]
+
+
+def rebuild_timeline(user):
+    following_users = social_graph.following_of(user.id)
+    posts = (
+        Post.objects.filter(Q(author__in=following_users) | Q(author=user))
+        .exclude(Q(author__profile__fanout_on_read=True) & ~Q(author=user))
+        .order_by("-timestamp")
+        .values_list("id", "timestamp")[: settings.TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.filter(user=user).delete()
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=user, post_id=post_id, timestamp=timestamp)
+            for post_id, timestamp in posts
+        ]
+    )
+
+
+def get_timeline_posts(user):
+    timeline = (
+        TimelineEntry.objects.filter(user=user)
+        .order_by("-timestamp", "-post")
+        .values("post")[: settings.TIMELINE_MAX_LENGTH]
+    )
+    high_fanout_authors = Profile.objects.filter(
+        user_id__in=social_graph.following_of(user.id), fanout_on_read=True
+    ).values("user")
+    return Post.objects.filter(Q(id__in=timeline) | Q(author__in=high_fanout_authors))
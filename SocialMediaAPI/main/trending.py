@@ -0,0 +1,73 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Least, Ln
+from django.utils import timezone
+from .models import Comment, Like, Post
+
+# A post's trending score is the log of its decayed engagement,
+#   ln(sum of weight * 2 ** ((event time - EPOCH) / half-life))
+# over the post itself, its likes and its comments. Time shifts every score
+# by the same amount, so the ordering holds without rewriting any row, and an
+# event only adds its own term. Scores of 0 are posts not scored yet.
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+ORDERING = ("-trending_score", "-id")
+
+
+def event_score(weight, at=None):
+    at = timezone.now() if at is None else at
+    half_lives = (at - EPOCH).total_seconds() / (
+        settings.TRENDING_HALF_LIFE_HOURS * 3600
+    )
+    return math.log(weight) + half_lives * math.log(2)
+
+
+def add_score(score, term):
+    # ln(exp(score) + exp(term)) without overflowing. PostgreSQL raises on
+    # exp() underflow, and ln(1 + exp(-700)) is 0 to double precision anyway.
+    distance = Least(Abs(score - Value(term)), Value(700.0))
+    return Greatest(score, Value(term)) + Ln(Value(1.0) + Exp(-distance))
+
+
+def engagement(likes=0, comments=0, at=None):
+    # The new trending_score of posts that gained likes and comments, for
+    # use in QuerySet.update().
+    weight = (
+        likes * settings.TRENDING_LIKE_WEIGHT
+        + comments * settings.TRENDING_COMMENT_WEIGHT
+    )
+    return add_score(F("trending_score"), event_score(weight, at))
+
+
+def log_sum_exp(terms):
+    top = max(terms)
+    return top + math.log(sum(math.exp(term - top) for term in terms))
+
+
+def rebuild_trending_scores(posts=None):
+    # Recomputes scores from the Like and Comment tables, which also drops
+    # the terms of removed likes and comments that increments left behind.
+    posts = Post.objects.all() if posts is None else posts
+    terms = defaultdict(list)
+    for post_id, timestamp in posts.values_list("id", "timestamp"):
+        terms[post_id].append(event_score(settings.TRENDING_POST_WEIGHT, timestamp))
+    for model, weight in (
+        (Like, settings.TRENDING_LIKE_WEIGHT),
+        (Comment, settings.TRENDING_COMMENT_WEIGHT),
+    ):
+        events = model.objects.filter(post__in=posts).values_list(
+            "post_id", "created_at"
+        )
+        for post_id, created_at in events.iterator(chunk_size=10000):
+            terms[post_id].append(event_score(weight, created_at))
+
+    return Post.objects.bulk_update(
+        [
+            Post(id=post_id, trending_score=log_sum_exp(post_terms))
+            for post_id, post_terms in terms.items()
+        ],
+        ["trending_score"],
+        batch_size=1000,
+    )
@@ -0,0 +1,337 @@
+import hashlib
+import math
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from django.utils.module_loading import import_string
+from . import media_store
+from .models import Post, Profile, UploadSession
+
+# Media is uploaded in parts that go from the client to storage without
+# passing through a worker's memory. A session records the file, its part
+# size and the backend's id for the upload; the client fetches a URL per
+# part, PUTs each part to it, keeps the ETag header of every response, and
+# completes the session with the part numbers and ETags, which creates the
+# post or sets the profile picture. A session can be resumed from its list
+# of uploaded parts until it expires.
+
+MAX_PARTS = 10000
+STREAM_CHUNK_SIZE = 64 * 1024
+
+FIELDS = {
+    UploadSession.POST: Post._meta.get_field("media"),
+    UploadSession.PROFILE_PICTURE: Profile._meta.get_field("profile_picture"),
+}
+
+_backend = None
+
+
+class UploadError(Exception):
+    pass
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.UPLOAD_BACKEND)()
+    return _backend
+
+
+def get_part_size(size):
+    return max(settings.UPLOAD_PART_SIZE, math.ceil(size / MAX_PARTS))
+
+
+def get_part_count(session):
+    return max(1, math.ceil(session.size / session.part_size))
+
+
+def storage_key(session):
+    # A name unique to the session, so parts never land on an existing file.
+    field = FIELDS[session.target]
+    prefix = f"{field.upload_to}{session.id.hex}/"
+    root, ext = os.path.splitext(field.storage.get_valid_name(session.filename))
+    return prefix + root[: field.max_length - len(prefix) - len(ext)] + ext
+
+
+def create_session(user, **data):
+    session = UploadSession(user=user, **data)
+    session.part_size = get_part_size(session.size)
+    session.key = storage_key(session)
+    session.expires_at = timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    session.upload_id = get_backend().start(session)
+    session.save()
+    return session
+
+
+def get_progress(session, request, after=0):
+    # Uploaded parts, and URLs for the next missing ones.
+    parts = get_backend().list_parts(session)
+    uploaded = {part["part_number"] for part in parts}
+    missing = (
+        number
+        for number in range(after + 1, get_part_count(session) + 1)
+        if number not in uploaded
+    )
+    urls = []
+    for number in missing:
+        if len(urls) == settings.UPLOAD_URLS_PER_RESPONSE:
+            break
+        urls.append(
+            {
+                "part_number": number,
+                "url": get_backend().part_url(session, number, request),
+            }
+        )
+    return {"part_count": get_part_count(session), "parts": parts, "urls": urls}
+
+
+def check_parts(session, parts, uploaded):
+    # parts as sent by the client, uploaded as returned by list_parts(): the
+    # client must list every part of the file, each with its ETag.
+    count = get_part_count(session)
+    if [part["part_number"] for part in parts] != list(range(1, count + 1)):
+        raise UploadError(
+            f"Every part from 1 to {count} must be listed, in ascending order."
+        )
+    uploaded = {part["part_number"]: part for part in uploaded}
+    for part in parts:
+        if uploaded.get(part["part_number"], {}).get("etag") != part["etag"]:
+            raise UploadError(
+                f"Part {part['part_number']} was not uploaded with this ETag."
+            )
+    if sum(uploaded[number]["size"] for number in range(1, count + 1)) != session.size:
+        raise UploadError("The parts do not add up to the size of the file.")
+
+
+def complete_session(session, parts):
+    """
+    Assemble the file and create the post or set the profile picture. The
+    session must be marked COMPLETING by the caller, so that no other request
+    touches it while storage does its work outside any transaction; it goes
+    back to PENDING if the backend rejects the parts.
+    """
+    try:
+        name = get_backend().complete(session, parts)
+    except Exception:
+        session.status = UploadSession.PENDING
+        session.save(update_fields=["status"])
+        raise
+    try:
+        with transaction.atomic():
+            if session.target == UploadSession.POST:
+                session.post = Post.objects.create(
+                    author=session.user, content=session.content, media=name
+                )
+                result = session.post
+            else:
+                result = session.user.profile
+                result.profile_picture = name
+                result.save(update_fields=["profile_picture"])
+            session.status = UploadSession.COMPLETED
+            session.save(update_fields=["status", "post"])
+    except Exception:
+        if session.target == UploadSession.POST:
+            media_store.release(name)
+        raise
+    return result
+
+
+def abort_session(session):
+    get_backend().abort(session)
+    session.status = UploadSession.ABORTED
+    session.save(update_fields=["status"])
+
+
+class S3UploadBackend:
+    """S3 multipart uploads, with presigned URLs for the parts."""
+
+    def __init__(self):
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+
+        self.client = boto3.client(
+            "s3",
+            region_name=settings.AWS_S3_REGION_NAME,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            config=Config(signature_version="s3v4"),
+        )
+        self.bucket = settings.AWS_STORAGE_BUCKET_NAME
+        self.client_error = ClientError
+
+    def start(self, session):
+        response = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=session.key, ContentType=session.content_type
+        )
+        return response["UploadId"]
+
+    def part_url(self, session, part_number, request):
+        return self.client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": self.bucket,
+                "Key": session.key,
+                "UploadId": session.upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=settings.UPLOAD_URL_EXPIRY,
+        )
+
+    def list_parts(self, session):
+        pages = self.client.get_paginator("list_parts").paginate(
+            Bucket=self.bucket, Key=session.key, UploadId=session.upload_id
+        )
+        return [
+            {
+                "part_number": part["PartNumber"],
+                "etag": part["ETag"],
+                "size": part["Size"],
+            }
+            for page in pages
+            for part in page.get("Parts", [])
+        ]
+
+    def complete(self, session, parts):
+        check_parts(session, parts, self.list_parts(session))
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=session.key,
+                UploadId=session.upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": part["part_number"], "ETag": part["etag"]}
+                        for part in parts
+                    ]
+                },
+            )
+        except self.client_error as error:
+            raise UploadError(error.response["Error"].get("Message", str(error)))
+        size = self.client.head_object(Bucket=self.bucket, Key=session.key)[
+            "ContentLength"
+        ]
+        # A part replaced after list_parts() could change the size.
+        if size != session.size:
+            self.client.delete_object(Bucket=self.bucket, Key=session.key)
+            raise UploadError("The file is not the size given for the upload.")
+        return session.key
+
+    def abort(self, session):
+        try:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=session.key, UploadId=session.upload_id
+            )
+        except self.client_error as error:
+            if error.response["Error"]["Code"] != "NoSuchUpload":
+                raise
+
+
+class LocalUploadBackend:
+    """
+    Parts written to UPLOAD_LOCAL_ROOT by the upload_part view, through
+    signed URLs that stand in for S3's presigned ones, and assembled into the
+    field's storage on completion.
+    """
+
+    salt = "main.uploads.part"
+
+    def get_directory(self, session):
+        return os.path.join(settings.UPLOAD_LOCAL_ROOT, session.id.hex)
+
+    def start(self, session):
+        os.makedirs(self.get_directory(session), exist_ok=True)
+        return session.id.hex
+
+    def part_url(self, session, part_number, request):
+        signature = signing.dumps(
+            {"session": session.id.hex, "part": part_number}, salt=self.salt
+        )
+        url = reverse("upload_part", args=[session.id, part_number])
+        return request.build_absolute_uri(
+            f"{url}?{urlencode({'signature': signature})}"
+        )
+
+    def check_signature(self, session, part_number, signature):
+        try:
+            signed = signing.loads(
+                signature, salt=self.salt, max_age=settings.UPLOAD_URL_EXPIRY
+            )
+        except signing.BadSignature:
+            return False
+        return signed == {"session": session.id.hex, "part": part_number}
+
+    def receive_part(self, session, part_number, stream):
+        # Streamed to disk while hashing; the part replaces any earlier copy
+        # only once it has been written in full.
+        directory = self.get_directory(session)
+        digest = hashlib.md5()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+            try:
+                while chunk := stream.read(STREAM_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > session.part_size:
+                        raise UploadError("The part is larger than the part size.")
+                    digest.update(chunk)
+                    output.write(chunk)
+            except BaseException:
+                os.unlink(output.name)
+                raise
+        etag = digest.hexdigest()
+        path = os.path.join(directory, f"{part_number:05d}-{etag}.part")
+        previous = self.get_parts(session).get(part_number)
+        os.replace(output.name, path)
+        if previous and previous[1] != path:
+            os.unlink(previous[1])
+        return f'"{etag}"'
+
+    def get_parts(self, session):
+        # Part number to (ETag, path) of every part written so far.
+        directory = self.get_directory(session)
+        if not os.path.isdir(directory):
+            return {}
+        parts = {}
+        for name in os.listdir(directory):
+            if name.endswith(".part"):
+                number, digest = name[: -len(".part")].split("-")
+                parts[int(number)] = (f'"{digest}"', os.path.join(directory, name))
+        return parts
+
+    def list_parts(self, session):
+        return [
+            {"part_number": number, "etag": etag, "size": os.path.getsize(path)}
+            for number, (etag, path) in sorted(self.get_parts(session).items())
+        ]
+
+    def complete(self, session, parts):
+        uploaded = self.get_parts(session)
+        check_parts(session, parts, self.list_parts(session))
+        files = [uploaded[part["part_number"]][1] for part in parts]
+
+        # Post media is hashed as it is assembled and stored by content.
+        digest = hashlib.sha256()
+        with tempfile.TemporaryFile(dir=settings.UPLOAD_LOCAL_ROOT) as assembled:
+            for path in files:
+                with open(path, "rb") as part:
+                    while chunk := part.read(STREAM_CHUNK_SIZE):
+                        digest.update(chunk)
+                        assembled.write(chunk)
+            file = File(assembled, name=session.filename)
+            if session.target == UploadSession.POST:
+                name = media_store.store(file, digest.hexdigest())
+            else:
+                name = FIELDS[session.target].storage.save(session.key, file)
+        shutil.rmtree(self.get_directory(session), ignore_errors=True)
+        return name
+
+    def abort(self, session):
+        shutil.rmtree(self.get_directory(session), ignore_errors=True)
@@ -3,7 +3,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # retrieve token
@@ -24,6 +24,7 @@ urlpatterns = [
     ),
     # retrieve, create, update, or delete a post
     path("posts/", views.ListPostView.as_view(), name="list_post"),
+    path("posts/trending/", views.TrendingPostView.as_view(), name="trending_post"),
     path("create-post/", views.CreatePostView.as_view(), name="create_post"),
     path("search-post/", views.SearchPostView.as_view(), name="search-post"),
     path(
@@ -54,6 +55,7 @@ urlpatterns = [
         name="list_create_like",
     ),
     path("like/<int:pk>/delete/", views.DeleteLikeView.as_view(), name="delete_like"),
+    path("like/batch/", views.BatchLikeView.as_view(), name="batch_like"),
     # retrieve all users you are following, follow or unfollow users
     path("following-list/", views.ListCreateFollowView.as_view(), name="list_follow"),
     path("follower-list/", views.ListFollowerView.as_view(), name="list_follow"),
@@ -67,6 +69,75 @@ urlpatterns = [
         views.DeleteFollowView.as_view(),
         name="delete_follow",
     ),
+    path("follow/batch/", views.BatchFollowView.as_view(), name="batch_follow"),
+    path(
+        "recommendations/",
+        views.ListRecommendationView.as_view(),
+        name="list_recommendation",
+    ),
     # list notifications
     path("notifications/", views.ListNotification.as_view(), name="list_notification"),
+    path(
+        "notifications/inbox/", views.ListInboxView.as_view(), name="notification_inbox"
+    ),
+    path(
+        "notifications/unread-count/",
+        views.UnreadNotificationCountView.as_view(),
+        name="unread_notification_count",
+    ),
+    path(
+        "notifications/mark-read/",
+        views.MarkNotificationsReadView.as_view(),
+        name="mark_notifications_read",
+    ),
+    path(
+        "notifications/stream/",
+        views.notification_stream,
+        name="notification_stream",
+    ),
+    # async variants of the read-heavy endpoints, for ASGI deployments
+    path(
+        "async/user/<int:pk>/",
+        async_views.AsyncRetrieveUserView.as_view(),
+        name="async_retrieve_user",
+    ),
+    path(
+        "async/profile/<int:pk>/",
+        async_views.AsyncRetrieveProfileView.as_view(),
+        name="async_retrieve_profile",
+    ),
+    path(
+        "async/posts/", async_views.AsyncListPostView.as_view(), name="async_list_post"
+    ),
+    path(
+        "async/comments/<int:post_id>/",
+        async_views.AsyncListCommentView.as_view(),
+        name="async_list_comment",
+    ),
+    path(
+        "async/notifications/",
+        async_views.AsyncListNotification.as_view(),
+        name="async_list_notification",
+    ),
+    # response cache statistics
+    path("cache-stats/", views.CacheStatsView.as_view(), name="cache_stats"),
+    # export the authenticated user's data as NDJSON
+    path("export/", views.ExportView.as_view(), name="export"),
+    # chunked media uploads
+    path("uploads/", views.CreateUploadSessionView.as_view(), name="create_upload"),
+    path(
+        "uploads/<uuid:pk>/",
+        views.RetrieveAbortUploadSessionView.as_view(),
+        name="retrieve_abort_upload",
+    ),
+    path(
+        "uploads/<uuid:pk>/complete/",
+        views.CompleteUploadView.as_view(),
+        name="complete_upload",
+    ),
+    path(
+        "uploads/<uuid:pk>/parts/<int:part_number>/",
+        views.UploadPartView.as_view(),
+        name="upload_part",
+    ),
 ]
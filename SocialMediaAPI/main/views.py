@@ -1,33 +1,56 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from . import serializers
+from django.middleware.gzip import re_accepts_gzip
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+from . import media_store, serializers, social_graph, trending
 from rest_framework import generics
-from .models import CustomUser, Profile, Post, Comment, Like, Follow, Notification
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from .models import (
+    CustomUser,
+    Profile,
+    Post,
+    Comment,
+    Like,
+    Follow,
+    FollowRecommendation,
+    Notification,
+    UploadSession,
+)
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework import status
 from datetime import datetime, time as dt_time
-from rest_framework.pagination import PageNumberPagination
+from .batch import follow_users, like_posts, unfollow_users, unlike_posts
+from .export import export_stream
+from .inbox import get_unread_count, mark_read
+from .realtime import authenticate_stream, event_stream
+from .pagination import CustomPagination, KeysetPagination, SelectablePagination
+from .response_cache import CachedResponseMixin, get_stats
 from .posts_comments_functions import *
 from rest_framework import permissions
 from django.core.exceptions import ValidationError as django_validation_error
-
-
-class CustomPagination(PageNumberPagination):
-    page_size = 10
-    page_query_param = "page_size"
-    max_page_size = 10
-
-    def get_paginated_response(self, data):
-        return Response(
-            {
-                "links": {
-                    "next": self.get_next_link(),
-                    "previous": self.get_previous_link(),
-                },
-                "count": self.page.paginator.count,
-                "results": data,
-            }
-        )
+from django.conf import settings
+from django.db import transaction
+from .search import get_search_ordering, search_posts
+from .timeline import get_timeline_posts
+from .uploads import (
+    LocalUploadBackend,
+    UploadError,
+    abort_session,
+    complete_session,
+    get_backend as get_upload_backend,
+)
+from .values_serializers import (
+    CommentValuesSerializer,
+    InboxValuesSerializer,
+    LikeValuesSerializer,
+    NotificationValuesSerializer,
+    PostValuesSerializer,
+    ValuesListMixin,
+)
 
 
 # USER RELATED VIEWS
@@ -42,65 +65,51 @@ class ListCreateUserView(generics.ListCreateAPIView):
         Profile.objects.create(user=user)
 
 
-class RetrieveUpdateUserView(generics.RetrieveUpdateAPIView):
+class RetrieveUpdateUserView(CachedResponseMixin, generics.RetrieveUpdateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = serializers.UpdateUserSerializer
     lookup_field = "pk"
+    cache_namespace = "user"
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
 # PROFILE RELATED VIEWS
-class RetrieveUpdateProfileView(generics.RetrieveUpdateAPIView):
+class RetrieveUpdateProfileView(CachedResponseMixin, generics.RetrieveUpdateAPIView):
     queryset = Profile.objects.all()
     serializer_class = serializers.UpdateProfileSerializer
     lookup_field = "pk"
+    cache_namespace = "profile"
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
 # POST RELATED VIEWS
-class ListPostView(generics.ListAPIView):
+class ListPostView(ValuesListMixin, generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = serializers.ListPostSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = PostValuesSerializer
+    pagination_class = SelectablePagination
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cursor_ordering(self):
+        return get_feed_ordering(self.request.query_params.get("sort_by"))
+
     def get_posts(self):
-        user = self.request.user
-        following_users = Follow.objects.filter(follower=user).values_list(
-            "following", flat=True
-        )
-        posts = Post.objects.filter(author__in=following_users).order_by(
-            "-timestamp"
-        ) | Post.objects.filter(author=user).order_by("-timestamp")
-        return posts
+        if settings.TIMELINE_ENABLED:
+            return get_timeline_posts(self.request.user)
+        return get_feed_posts(self.request.user)
 
     def get_queryset(self):
         sort_by = self.request.query_params.get("sort_by")
-        if sort_by is None:
-            posts = self.get_posts()
-            return posts
-
-        match sort_by:
-            case "likes":
-                posts = self.get_posts()
-                post_with_likes = list(map(get_post_likes, posts))
-                sorted_post_with_likes = sorted(
-                    post_with_likes,
-                    key=lambda post_data: post_data["total_likes"],
-                    reverse=True,
-                )
-                posts = list(map(get_sorted_posts, sorted_post_with_likes))
-                return posts
-            case "comments":
-                posts = self.get_posts()
-                post_with_comments = list(map(get_post_comments, posts))
-                sorted_post_with_comments = sorted(
-                    post_with_comments,
-                    key=lambda post_data: post_data["total_comments"],
-                    reverse=True,
-                )
-                posts = list(map(get_sorted_posts, sorted_post_with_comments))
-                return posts
+        return sort_posts(self.get_posts(), sort_by).select_related("author")
+
+
+class TrendingPostView(ValuesListMixin, generics.ListAPIView):
+    queryset = Post.objects.select_related("author").order_by(*trending.ORDERING)
+    serializer_class = serializers.ListPostSerializer
+    values_serializer_class = PostValuesSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = trending.ORDERING
 
 
 class CreatePostView(generics.CreateAPIView):
@@ -108,46 +117,52 @@ class CreatePostView(generics.CreateAPIView):
     serializer_class = serializers.CreatePostSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
     def perform_create(self, serializer):
+        media = serializer.validated_data.get("media")
+        if media:
+            # Stored by content, shared with earlier posts of the same bytes.
+            serializer.validated_data["media"] = media_store.store(media)
         serializer.save(author=self.request.user)
 
 
-class SearchPostView(generics.ListAPIView):
+class SearchPostView(ValuesListMixin, generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = serializers.ListPostSerializer
+    values_serializer_class = PostValuesSerializer
+    pagination_class = SelectablePagination
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cursor_ordering(self):
+        return get_search_ordering(self.request.query_params.get("keyword"))
+
     def get_queryset(self):
-        queryset = Post.objects.all()
+        queryset = Post.objects.select_related("author")
 
         date = self.request.query_params.get("date")
         time = self.request.query_params.get("time")
         keyword = self.request.query_params.get("keyword")
 
+        if time:
+            try:
+                hour, minute = time.split(":")
+                time = dt_time(int(hour), int(minute))
+            except ValueError as e:
+                raise ValidationError({"detail": "Invalid time format."})
+
         try:
-            if date:
-                queryset = queryset.filter(timestamp__date=date)
-                return queryset
-            if keyword:
-                queryset = queryset.filter(content__icontains=keyword)
-                return queryset
-            if time:
-                try:
-                    hour, minute = time.split(":")
-                    queryset = queryset.filter(
-                        timestamp__time=dt_time(int(hour), int(minute))
-                    )
-                    return queryset
-                except ValueError as e:
-                    raise ValidationError({"detail": "Invalid time format."})
+            return search_posts(queryset, keyword=keyword, date=date, time=time)
         except django_validation_error as e:
             raise ValidationError({"detail": str(e)})
 
 
-class RetrieveUpdateDeletePostView(generics.RetrieveUpdateDestroyAPIView):
+class RetrieveUpdateDeletePostView(
+    CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView
+):
     queryset = Post.objects.all()
     serializer_class = serializers.UpdateDeletePostSerializer
     lookup_field = "pk"
+    cache_namespace = "post"
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def perform_destroy(self, instance):
@@ -162,14 +177,21 @@ class RetrieveUpdateDeletePostView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # COMMENT RELATED VIEWS
-class ListCommentView(generics.ListAPIView):
+class ListCommentView(CachedResponseMixin, ValuesListMixin, generics.ListAPIView):
     serializer_class = serializers.ListCommentSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = CommentValuesSerializer
+    pagination_class = SelectablePagination
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("created_at", "id")
+    cache_namespace = "post-comments"
+    cache_lookup_kwarg = "post_id"
 
     def get_queryset(self):
         post_id = self.kwargs.get("post_id")
-        return Comment.objects.filter(post__id=post_id)
+        comments = Comment.objects.filter(post__id=post_id).select_related(
+            "author", "post__author"
+        )
+        return comments.order_by(*self.cursor_ordering)
 
 
 class CreateCommentView(generics.ListCreateAPIView):
@@ -178,10 +200,12 @@ class CreateCommentView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.comments.all()
+        return user.comments.select_related("author", "post__author")
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        update_post_counters(comment.post_id, comments=1)
 
 
 class UpdateCommentView(generics.UpdateAPIView):
@@ -201,7 +225,9 @@ class DeleteCommentView(generics.DestroyAPIView):
         comment_owner = instance.author
         authenticated_user = self.request.user
         if comment_owner == authenticated_user:
-            instance.delete()
+            with transaction.atomic():
+                instance.delete()
+                update_post_counters(instance.post_id, comments=-1)
         else:
             raise PermissionDenied(
                 {"detail": "You are not authorized to delete this comment."}
@@ -209,28 +235,29 @@ class DeleteCommentView(generics.DestroyAPIView):
 
 
 # LIKE RELATED VIEWS
-class ListCreateLikeView(generics.ListCreateAPIView):
+class ListCreateLikeView(ValuesListMixin, generics.ListCreateAPIView):
     serializer_class = serializers.ListCreateDeleteLikeSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = LikeValuesSerializer
+    pagination_class = SelectablePagination
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
-        return user.likes.all()
+        likes = user.likes.select_related("user", "post__author")
+        return likes.order_by(*self.cursor_ordering)
 
     def perform_create(self, serializer):
-        try:
-            post_id = self.kwargs.get("post_id")
-            post = Post.objects.get(id=post_id)
-            like = Like.objects.get(user=self.request.user, post=post_id)
-            if like:
-                raise ValidationError({"detail": "You have already liked this post."})
-        except Like.DoesNotExist:
-            serializer.save(user=self.request.user, post=post)
-        except Post.DoesNotExist:
+        post_id = self.kwargs.get("post_id")
+        likes = insert_likes(self.request.user, [post_id])
+        if post_id not in likes:
             raise ValidationError(
                 {"detail": f"Post with id '{post_id}' does not exist."}
             )
+        post, like = likes[post_id]
+        if like is None:
+            raise ValidationError({"detail": "You have already liked this post."})
+        serializer.instance = like
 
 
 class DeleteLikeView(generics.DestroyAPIView):
@@ -245,7 +272,9 @@ class DeleteLikeView(generics.DestroyAPIView):
             like_owner = like.user
             authenticated_user = self.request.user
             if like_owner == authenticated_user:
-                like.delete()
+                with transaction.atomic():
+                    like.delete()
+                    update_post_counters(instance.id, likes=-1)
             else:
                 raise PermissionDenied(
                     {"detail": "You are not authorized to unlike this post."}
@@ -254,6 +283,23 @@ class DeleteLikeView(generics.DestroyAPIView):
             raise ValidationError({"detail": "You have not liked this post."})
 
 
+class BatchLikeView(generics.GenericAPIView):
+    serializer_class = serializers.BatchLikeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = like_posts(request.user, serializer.validated_data["post_ids"])
+        return Response({"results": results})
+
+    def delete(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = unlike_posts(request.user, serializer.validated_data["post_ids"])
+        return Response({"results": results})
+
+
 # FOLLOW RELATED VIEWS
 class ListFollowerView(generics.ListAPIView):
     serializer_class = serializers.ListCreateFollowSerializer
@@ -262,7 +308,7 @@ class ListFollowerView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.followers.all()
+        return user.followers.select_related("follower", "following")
 
 
 class ListCreateFollowView(generics.ListCreateAPIView):
@@ -272,12 +318,14 @@ class ListCreateFollowView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return user.following.all()
+        return user.following.select_related("follower", "following")
 
     def perform_create(self, serializer):
         follower_id = self.kwargs.get("follower_id")
         if follower_id == self.request.user.id:
             raise ValidationError({"detail": "You cannot follow yourself."})
+        elif social_graph.is_following(self.request.user.id, follower_id):
+            raise ValidationError({"detail": "You are already following this user."})
         else:
             following = CustomUser.objects.get(id=follower_id)
             serializer.save(follower=self.request.user, following=following)
@@ -310,17 +358,239 @@ class DeleteFollowView(generics.DestroyAPIView):
             )
 
 
+class BatchFollowView(generics.GenericAPIView):
+    serializer_class = serializers.BatchFollowSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = follow_users(request.user, serializer.validated_data["user_ids"])
+        return Response({"results": results})
+
+    def delete(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = unfollow_users(request.user, serializer.validated_data["user_ids"])
+        return Response({"results": results})
+
+
+class ListRecommendationView(generics.ListAPIView):
+    serializer_class = serializers.FollowRecommendationSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-mutual_count", "candidate_id")
+
+    def get_queryset(self):
+        # Recommendations are precomputed by generate_recommendations; users
+        # followed since then are dropped here.
+        user = self.request.user
+        return (
+            FollowRecommendation.objects.filter(user=user)
+            .exclude(candidate_id__in=social_graph.following_of(user.id))
+            .select_related("candidate")
+        )
+
+
 # NOTIFICATIONS RELATED VIEWS
-class ListNotification(generics.ListAPIView):
+class ListNotification(ValuesListMixin, generics.ListAPIView):
     queryset = Notification.objects.all()
     serializer_class = serializers.ListNotificationSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = NotificationValuesSerializer
+    pagination_class = SelectablePagination
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
-        user = self.request.user
-        following_users = Follow.objects.filter(follower=user).values_list(
-            "following", flat=True
+        following_users = social_graph.following_of(self.request.user.id)
+        notifications = Notification.objects.filter(
+            sender__in=following_users
+        ).select_related(
+            "recipient",
+            "sender",
+            "post__author",
+            "follow__follower",
+            "follow__following",
+            "comment__author",
+        )
+        return notifications.order_by(*self.cursor_ordering)
+
+
+class ListInboxView(ValuesListMixin, generics.ListAPIView):
+    serializer_class = serializers.InboxNotificationSerializer
+    values_serializer_class = InboxValuesSerializer
+    pagination_class = SelectablePagination
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(
+            recipient=self.request.user
+        ).select_related(
+            "recipient",
+            "sender",
+            "post__author",
+            "follow__follower",
+            "follow__following",
+            "comment__author",
+        )
+        if self.request.query_params.get("unread") in ("1", "true"):
+            notifications = notifications.filter(read=False)
+        return notifications.order_by(*self.cursor_ordering)
+
+
+class UnreadNotificationCountView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    use_primary = True
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread": get_unread_count(request.user)})
+
+
+class MarkNotificationsReadView(generics.GenericAPIView):
+    serializer_class = serializers.MarkNotificationsReadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marked = mark_read(request.user, serializer.validated_data.get("up_to"))
+        return Response({"marked": marked}, status=status.HTTP_200_OK)
+
+
+@require_GET
+async def notification_stream(request):
+    # Under WSGI the endless stream would be read to the end before anything
+    # is sent, holding the worker forever.
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "The notification stream requires an ASGI server."},
+            status=501,
+        )
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    response = StreamingHttpResponse(
+        event_stream(user.id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# EXPORT RELATED VIEWS
+class ExportView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        compress = bool(
+            re_accepts_gzip.search(request.headers.get("Accept-Encoding", ""))
+        )
+        response = StreamingHttpResponse(
+            export_stream(request.user, compress=compress),
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{request.user.username}.ndjson"'
+        )
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+# UPLOAD RELATED VIEWS
+class CreateUploadSessionView(generics.CreateAPIView):
+    serializer_class = serializers.UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class RetrieveAbortUploadSessionView(generics.RetrieveDestroyAPIView):
+    serializer_class = serializers.UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        if instance.status != UploadSession.PENDING:
+            raise ValidationError({"detail": f"This upload is {instance.status}."})
+        abort_session(instance)
+
+
+class CompleteUploadView(generics.GenericAPIView):
+    serializer_class = serializers.CompleteUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # The row is locked only to claim the session; the file is assembled
+        # once the claim is committed.
+        with transaction.atomic():
+            session = generics.get_object_or_404(
+                UploadSession.objects.select_for_update().select_related("user"),
+                pk=kwargs["pk"],
+                user=request.user,
+            )
+            if session.status != UploadSession.PENDING:
+                raise ValidationError({"detail": f"This upload is {session.status}."})
+            if session.expires_at <= timezone.now():
+                raise ValidationError({"detail": "This upload has expired."})
+            session.status = UploadSession.COMPLETING
+            session.save(update_fields=["status"])
+        try:
+            result = complete_session(session, serializer.validated_data["parts"])
+        except UploadError as error:
+            raise ValidationError({"detail": str(error)})
+
+        context = self.get_serializer_context()
+        if session.target == UploadSession.POST:
+            data = serializers.CreatePostSerializer(result, context=context).data
+            return Response(data, status=status.HTTP_201_CREATED)
+        return Response(
+            serializers.UpdateProfileSerializer(result, context=context).data
+        )
+
+
+class UploadPartView(generics.GenericAPIView):
+    # The target of LocalUploadBackend's part URLs, which carry their own
+    # signature in place of credentials. The body is streamed to disk and
+    # never parsed.
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def put(self, request, *args, **kwargs):
+        backend = get_upload_backend()
+        if not isinstance(backend, LocalUploadBackend):
+            raise NotFound()
+        session = generics.get_object_or_404(
+            UploadSession,
+            pk=kwargs["pk"],
+            status=UploadSession.PENDING,
+            expires_at__gt=timezone.now(),
         )
-        notifications = Notification.objects.filter(sender__in=following_users)
-        return notifications
+        part_number = kwargs["part_number"]
+        signature = request.query_params.get("signature", "")
+        if not backend.check_signature(session, part_number, signature):
+            raise PermissionDenied("This part URL is invalid or has expired.")
+        if request.stream is None:
+            raise ValidationError({"detail": "The part is empty."})
+        try:
+            etag = backend.receive_part(session, part_number, request.stream)
+        except UploadError as error:
+            raise ValidationError({"detail": str(error)})
+        return Response(status=status.HTTP_200_OK, headers={"ETag": etag})
+
+
+# CACHE RELATED VIEWS
+class CacheStatsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_stats())